@@ -13,7 +13,7 @@ class SuperuserAutoVerifyBackend(ModelBackend):
         """Authenticate and auto-verify superusers"""
         try:
             # Try to get user
-            user = User.objects.get(email=username)
+            user = User.objects.get_by_email(username)
             
             # Check password
             if user.check_password(password):
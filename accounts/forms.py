@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from .models import canonical_email
 
 UserModel = get_user_model()
 
@@ -43,6 +44,13 @@ class SignUpForm(UserCreationForm):
             raise forms.ValidationError("Please use a verified university email address.")
         return email
 
+    def clean_email(self):
+        """Reject addresses already registered under a different letter case."""
+        email = self.cleaned_data.get("email")
+        if email and UserModel._default_manager.filter(email_canonical=canonical_email(email)).exists():
+            raise forms.ValidationError("An account with this email already exists.")
+        return email
+
     def save(self, commit: bool = True):
         user = super().save(commit=False)
         # Copy email if it's not the username field
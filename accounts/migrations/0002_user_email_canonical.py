@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+
+
+def backfill_email_canonical(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+
+    # The column becomes unique, so addresses differing only by case must be merged first
+    clashes = list(
+        User.objects.annotate(canonical=Lower('email')).values('canonical')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('canonical', flat=True)[:20]
+    )
+    if clashes:
+        raise RuntimeError(
+            'Users share an email address that differs only by case; '
+            'resolve these before migrating: ' + ', '.join(clashes)
+        )
+
+    # Walk the table in primary-key batches so no single statement touches every row
+    last_id = 0
+    while True:
+        batch = list(User.objects.filter(id__gt=last_id).order_by('id').only('id', 'email')[:BATCH_SIZE])
+        if not batch:
+            break
+        for user in batch:
+            user.email_canonical = (user.email or '').strip().lower()
+        User.objects.bulk_update(batch, ['email_canonical'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_canonical',
+            field=models.EmailField(editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(backfill_email_canonical, migrations.RunPython.noop),
+    ]
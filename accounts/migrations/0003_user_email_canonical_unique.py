@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Kept apart from the backfill so the constraint is built in its own transaction"""
+
+    dependencies = [
+        ('accounts', '0002_user_email_canonical'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email_canonical',
+            field=models.EmailField(editable=False, max_length=254, unique=True),
+        ),
+    ]
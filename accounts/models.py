@@ -7,7 +7,19 @@ from datetime import timedelta
 import random
 
 
+def canonical_email(email):
+    """Form of an email address used for lookups and uniqueness (trimmed, lowercased)"""
+    return (email or "").strip().lower()
+
+
 class UserManager(BaseUserManager):
+    def get_by_email(self, email):
+        """Case-insensitive lookup that seeks the unique email_canonical index"""
+        return self.get(email_canonical=canonical_email(email))
+
+    def get_by_natural_key(self, username):
+        return self.get_by_email(username)
+
     def create_user(self, email, password=None, **extra_fields):
         """Create and save a regular user."""
         if not email:
@@ -28,9 +40,15 @@ class UserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
+# Fields that decide whether a user's posts and skills are shown to others
+PUBLIC_AUTHOR_FIELDS = frozenset({"is_staff", "is_superuser"})
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """Custom User model using email instead of username."""
     email = models.EmailField(unique=True)
+    # Lowercased copy of email, kept by save(); every lookup by address goes through it
+    email_canonical = models.EmailField(unique=True, editable=False)
     email_verified = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
     is_active = models.BooleanField(default=True)
@@ -41,9 +59,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    def save(self, *args, **kwargs):
+        self.email_canonical = canonical_email(self.email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"email_canonical"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
+    @property
+    def is_public_author(self):
+        """Staff and superuser content is kept out of the marketplace and search"""
+        return not (self.is_staff or self.is_superuser)
+
 
 class OTP(models.Model):
     """Model for handling OTPs (signup, login, password reset)."""
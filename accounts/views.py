@@ -199,7 +199,7 @@ def forgot_password_view(request):
             return render(request, 'accounts/forgot_password.html')
 
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
 
             # Generate OTP for password reset
             otp = OTP.issue(
@@ -259,7 +259,7 @@ def reset_verify_otp_view(request):
             return render(request, 'accounts/reset_verify_otp.html', {'email': reset_email})
 
         try:
-            user = User.objects.get(email=reset_email)
+            user = User.objects.get_by_email(reset_email)
 
             # Get the most recent unused OTP for password reset
             otp = OTP.objects.filter(
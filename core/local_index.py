@@ -0,0 +1,66 @@
+"""
+In-process indexes that every worker rebuilds when a shared version changes.
+
+A ``VersionedIndex`` holds the result of ``build()`` in process memory. Writers
+call ``bump()`` (usually from a signal, on commit), which stores a new token
+under ``version_key`` in the default cache. Readers compare that token against
+the one they built from, at most every ``check_seconds``, and rebuild lazily
+on the first read after it changes. ``max_age`` forces a rebuild even without
+a bump, for indexes fed by writes that are too frequent to bump on.
+
+A bump only reaches other workers when the default cache is shared (Redis);
+with the local-memory cache it is seen by the writing process alone, and
+``max_age`` is what bounds how stale the other workers can get.
+"""
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+class VersionedIndex:
+    def __init__(self, version_key, build, check_seconds=2.0, max_age=None):
+        self.version_key = version_key
+        self.build = build
+        self.check_seconds = check_seconds
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._built = 0.0
+        self._checked = 0.0
+        self._value = None
+
+    def bump(self):
+        """Mark every worker's copy stale"""
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+        self._checked = 0.0
+
+    def peek(self):
+        """This process's built copy, or None; never builds or reads the cache"""
+        return self._value if self._version is not None else None
+
+    def expire(self):
+        """Rebuild this process's copy on its next ``get()``, without bumping the others"""
+        self._version = None
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def get(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked < self.check_seconds:
+            return self._value
+        version = self._current_version()
+        with self._lock:
+            expired = self.max_age is not None and now - self._built > self.max_age
+            if version != self._version or expired:
+                self._value = self.build()
+                self._version = version
+                self._built = now
+            self._checked = now
+        return self._value
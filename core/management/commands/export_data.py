@@ -0,0 +1,38 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from core.exports import EXPORTS, FORMATS, iter_lines, iter_rows, parse_bound, resolve_user
+
+
+class Command(BaseCommand):
+    help = 'Stream credit transactions or sessions to CSV/NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--start', help='Only rows created on/after this date or datetime')
+        parser.add_argument('--end', help='Only rows created before the end of this date (or before this datetime)')
+        parser.add_argument('--user', help='Only rows involving this user id or email')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per query')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        spec = EXPORTS[options['name']]
+        try:
+            rows = iter_rows(
+                spec,
+                start=parse_bound(options['start']),
+                end=parse_bound(options['end'], end=True),
+                user_id=resolve_user(options['user']),
+                chunk_size=max(1, options['chunk_size']),
+            )
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        if not options['output']:
+            for line in iter_lines(spec, rows, options['format']):
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', newline='') as out:
+            for line in iter_lines(spec, rows, options['format']):
+                out.write(line)
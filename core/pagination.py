@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination shared by list pages and JSON feeds.
+
+Pages are ordered newest first on ``(created_at, id)``; the cursor is the
+position of the last row shown, so fetching page N costs the same as page 1.
+``estimated_count`` gives a total to show alongside without an exact COUNT(*)
+over a large result set.
+"""
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(timestamp, pk):
+    raw = f"{timestamp.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, pk)``, or None for a missing or garbled cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit("|", 1)
+        timestamp = parse_datetime(timestamp)
+        return (timestamp, int(pk)) if timestamp else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of rows plus the cursor for the next one"""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _after(queryset, cursor, field):
+    queryset = queryset.order_by(f"-{field}", "-id")
+    position = decode_cursor(cursor)
+    if position:
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "id__lt": pk})
+        )
+    return queryset
+
+
+def _page(items, per_page, field):
+    # One extra row tells us whether another page exists without a COUNT
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor)
+
+
+def paginate_keyset(queryset, cursor=None, per_page=20, field="created_at"):
+    """Return the page after ``cursor`` from ``queryset``, newest first on ``(field, id)``"""
+    return _page(list(_after(queryset, cursor, field)[:per_page + 1]), per_page, field)
+
+
+def paginate_keyset_merged(querysets, cursor=None, per_page=20, field="created_at"):
+    """Page through the union of several querysets of one model, newest first.
+
+    Each queryset is read separately with its own LIMIT, so every branch can
+    walk its own index instead of the database sorting an OR of all of them.
+    """
+    seen = {}
+    for queryset in querysets:
+        for obj in _after(queryset, cursor, field)[:per_page + 1]:
+            seen.setdefault(obj.pk, obj)
+    items = sorted(seen.values(), key=lambda obj: (getattr(obj, field), obj.pk), reverse=True)
+    return _page(items[:per_page + 1], per_page, field)
+
+
+class EstimatedCount:
+    """A result total that may be approximate (``exact`` False) or a lower bound (``capped``)"""
+
+    def __init__(self, value, exact=True, capped=False):
+        self.value = value
+        self.exact = exact
+        self.capped = capped
+
+    @property
+    def label(self):
+        if self.capped:
+            return f"{self.value:,}+"
+        if not self.exact:
+            return f"about {self.value:,}"
+        return f"{self.value:,}"
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        return self.label
+
+
+def _planner_rows(queryset):
+    """Postgres' row estimate for ``queryset``, from EXPLAIN without running it"""
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimated_count(queryset, cap=1000):
+    """How many rows ``queryset`` has: exact up to ``cap``, estimated or capped beyond it.
+
+    Postgres answers large sets from the planner's estimate; other databases
+    count at most ``cap + 1`` rows and report "cap+".
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == "postgresql":
+        estimate = _planner_rows(queryset)
+        if estimate > cap:
+            return EstimatedCount(estimate, exact=False)
+    counted = queryset[:cap + 1].count()
+    if counted > cap:
+        return EstimatedCount(cap, exact=False, capped=True)
+    return EstimatedCount(counted)
@@ -1,11 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.contrib import messages
 from accounts.models import User
 from skills.models import UserSkill, Skill
 from profiles.models import Profile
 from posts.models import Post
+from core.pagination import EstimatedCount, estimated_count, paginate_keyset
+from search.cache import cached_results
+from search.engine import filter_matches, ranked
+from search.facets import facet_counts
+from search.fuzzy import did_you_mean
+from search.models import SearchDocument
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_KINDS = {
+    'posts': SearchDocument.Kind.POST,
+    'users': SearchDocument.Kind.USER,
+    'skills': SearchDocument.Kind.SKILL,
+}
 
 
 @login_required
@@ -16,13 +28,34 @@ def unified_search_view(request):
     search_type = request.GET.get('type', 'posts')  # 'posts', 'users', or 'skills'
     query = request.GET.get('q', '').strip()
     department = request.GET.get('department', '')
+    kind = request.GET.get('kind', '')  # posts: 'offer' or 'want'
+    level = request.GET.get('level', '')  # skills: proficiency level
+    sort = 'relevance' if request.GET.get('sort') == 'relevance' else 'newest'
+    cursor = request.GET.get('cursor', '')
+    
+    # Counts per department/kind/level for this query, one aggregate (cached)
+    facets = facet_counts(search_type, query)
+    department_counts = facets.get('department', {})
     
     results = []
     context = {
         'search_type': search_type,
         'query': query,
         'department': department,
-        'departments': UserSkill.DEPARTMENTS,
+        'kind': kind,
+        'level': level,
+        'sort': sort,
+        'result_count': 0,
+        'result_total': EstimatedCount(0),
+        'departments': [
+            (value, name, department_counts.get(value)) for value, name in UserSkill.DEPARTMENTS
+        ],
+        'kind_facets': [
+            (value, name, facets['kind'].get(value, 0)) for value, name in Post.KIND_CHOICES
+        ] if 'kind' in facets else [],
+        'level_facets': [
+            (value, name, facets['proficiency'].get(value, 0)) for value, name in UserSkill.PROFICIENCY_LEVELS
+        ] if 'proficiency' in facets else [],
     }
     
     # Get department name for display
@@ -31,56 +64,66 @@ def unified_search_view(request):
         context['department_name'] = dept_dict.get(department, department)
     
     if query:
+        # Full-text matching comes from search documents, which already leave
+        # out inactive posts and staff/superuser authors
+        queryset = None
+        field = 'created_at'
+        filters = ()
         if search_type == 'posts':
-            # Search for posts (exclude posts from staff/superusers)
-            posts = Post.objects.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(skill_name__icontains=query)
-            ).exclude(
-                Q(user__is_superuser=True) | Q(user__is_staff=True)
-            ).select_related('user__profile').order_by('-created_at')
+            queryset = Post.objects.public().select_related('user__profile')
             
-            # Filter by department if specified
+            # Filter by department if specified (author departments are stored on the post)
             if department:
-                posts = posts.filter(user__user_skills__department=department).distinct()
-            
-            results = posts[:20]
+                queryset = queryset.in_department(department)
+            if kind in ('offer', 'want'):
+                queryset = queryset.filter(kind=kind)
+            filters = (kind,)
             
         elif search_type == 'users':
-            # Search for users (exclude superusers and staff)
-            users = User.objects.filter(
-                Q(profile__display_name__icontains=query) |
-                Q(profile__full_name__icontains=query) |
-                Q(profile__handle__icontains=query) |
-                Q(email__icontains=query)
-            ).exclude(
-                Q(is_superuser=True) | Q(is_staff=True)
-            ).select_related('profile').distinct()
+            queryset = User.objects.select_related('profile')
+            field = 'date_joined'
             
             # Filter by department if specified
             if department:
-                users = users.filter(user_skills__department=department).distinct()
-            
-            results = users[:20]
+                queryset = queryset.filter(pk__in=UserSkill.objects.filter(department=department).values('user'))
             
         elif search_type == 'skills':
-            # Search for user skills (exclude staff/superusers)
-            user_skills = UserSkill.objects.filter(
-                Q(skill__name__icontains=query) |
-                Q(description__icontains=query)
-            ).exclude(
-                Q(user__is_superuser=True) | Q(user__is_staff=True)
-            ).select_related('user', 'user__profile', 'skill')
+            queryset = UserSkill.objects.filter(author_is_public=True).select_related('user', 'user__profile', 'skill')
             
             # Filter by department if specified
             if department:
-                user_skills = user_skills.filter(department=department)
-            
-            results = user_skills[:20]
+                queryset = queryset.filter(department=department)
+            if level:
+                queryset = queryset.filter(proficiency_level=level)
+            filters = (level,)
+        
+        if queryset is not None:
+            doc_kind = SEARCH_KINDS[search_type]
+            if sort == 'relevance':
+                # Best matches first; ranking covers one page only
+                results = cached_results(
+                    search_type, query, department, 'relevance',
+                    lambda: ranked(queryset, doc_kind, query, SEARCH_PAGE_SIZE),
+                    filters=filters,
+                )
+                total = EstimatedCount(len(results))
+                next_cursor = None
+            else:
+                def search():
+                    matches = filter_matches(queryset, doc_kind, query)
+                    page = paginate_keyset(matches, cursor, SEARCH_PAGE_SIZE, field)
+                    return page.items, page.next_cursor, estimated_count(matches)
+                
+                results, next_cursor, total = cached_results(
+                    search_type, query, department, cursor or 1, search, filters=filters,
+                )
+            context['result_count'] = total.value
+            context['result_total'] = total
+            context['next_cursor'] = next_cursor
     
     context['results'] = results
-    context['result_count'] = len(results)
+    if query:
+        context['did_you_mean'] = did_you_mean(query)
     
     return render(request, 'search/unified_search.html', context)
 
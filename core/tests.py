@@ -1,3 +1,130 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from posts.models import Post
+from search.cache import search_cache
+
+from .pagination import decode_cursor, encode_cursor, estimated_count, paginate_keyset
+
+User = get_user_model()
+
+
+def make_user(email):
+    """A verified user with a completed profile, so views are not redirected to setup"""
+    user = User.objects.create_user(email, "pw", email_verified=True)
+    user.profile.is_completed = True
+    user.profile.handle = email.split("@")[0]
+    user.profile.save()
+    return user
+
+
+class PagingTestMixin:
+    def setUp(self):
+        search_cache().clear()
+        self.user = make_user("reader@example.com")
+        self.client.force_login(self.user)
+
+    def make_posts(self, n, skill_name="Python"):
+        return [
+            Post.objects.create(
+                user=self.user, kind="offer", title=f"{skill_name} tutoring {i}", description="-", skill_name=skill_name,
+            ).pk
+            for i in range(n)
+        ]
+
+    def walk(self, url, context_key, **params):
+        """Every page of ``url`` in order, following next_cursor"""
+        pages, cursor = [], ""
+        while True:
+            response = self.client.get(url, {**params, "cursor": cursor})
+            pages.append([obj.pk for obj in response.context[context_key]])
+            cursor = response.context["next_cursor"]
+            if not cursor:
+                return pages
+
+
+class PaginateKeysetTests(PagingTestMixin, TestCase):
+    def test_pages_continue_without_duplicates_or_gaps(self):
+        made = self.make_posts(7)
+        # Equal timestamps leave the order to the id tiebreak
+        Post.objects.update(created_at=timezone.now())
+
+        seen, cursor = [], None
+        while True:
+            page = paginate_keyset(Post.objects.all(), cursor, per_page=3)
+            seen += [post.pk for post in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, sorted(made, reverse=True))
+
+    def test_garbled_cursor_falls_back_to_the_first_page(self):
+        self.make_posts(4)
+        first = [post.pk for post in paginate_keyset(Post.objects.all(), None, per_page=3)]
+
+        for cursor in ("not-a-cursor", "%%%", encode_cursor(timezone.now(), 1)[:-3]):
+            self.assertIsNone(decode_cursor(cursor))
+            self.assertEqual([post.pk for post in paginate_keyset(Post.objects.all(), cursor, per_page=3)], first)
+
+
+class EstimatedCountTests(PagingTestMixin, TestCase):
+    def test_exact_below_the_cap(self):
+        self.make_posts(3)
+
+        total = estimated_count(Post.objects.all())
+        self.assertEqual((total.value, total.exact, total.capped), (3, True, False))
+        self.assertEqual(total.label, "3")
+
+    def test_capped_above_the_cap(self):
+        Post.objects.bulk_create(
+            Post(user=self.user, kind="offer", title=f"Post {i}", description="-", skill_name="Python")
+            for i in range(1001)
+        )
+
+        total = estimated_count(Post.objects.all())
+        self.assertTrue(total.capped)
+        self.assertEqual(total.label, "1,000+")
+
+
+class SearchPagingTests(PagingTestMixin, TestCase):
+    def test_newest_first_pages_continue_without_duplicates_or_gaps(self):
+        made = self.make_posts(25)
+        self.make_posts(2, skill_name="Chemistry")
+
+        pages = self.walk(reverse("core:search"), "results", q="python")
+
+        self.assertEqual([len(page) for page in pages], [20, 5])
+        self.assertEqual(sum(pages, []), sorted(made, reverse=True))
+
+    def test_garbled_cursor_shows_the_first_page(self):
+        self.make_posts(25)
+        first = self.client.get(reverse("core:search"), {"q": "python"})
+
+        response = self.client.get(reverse("core:search"), {"q": "python", "cursor": "garbled"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["results"]), list(first.context["results"]))
+
+
+class MarketplacePagingTests(PagingTestMixin, TestCase):
+    def test_pages_continue_without_duplicates_or_gaps(self):
+        made = self.make_posts(23)
+
+        pages = self.walk(reverse("posts:list"), "posts")
+
+        self.assertEqual([len(page) for page in pages], [20, 3])
+        self.assertEqual(sum(pages, []), sorted(made, reverse=True))
+
+    def test_large_marketplace_shows_a_capped_total(self):
+        Post.objects.bulk_create(
+            Post(user=self.user, kind="offer", title=f"Post {i}", description="-", skill_name="Python")
+            for i in range(1001)
+        )
+
+        response = self.client.get(reverse("posts:list"))
+
+        self.assertEqual(response.context["total"].label, "1,000+")
+        self.assertContains(response, "1,000+ posts")
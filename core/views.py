@@ -1,7 +1,7 @@
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 
+from exchanges.dashboard import upcoming_sessions as upcoming_sessions_for
 from posts.models import Post
 
 User = get_user_model()
@@ -18,24 +18,14 @@ def home_view(request):
     
     if request.user.is_authenticated:
         # Get recent posts (exclude staff/superuser posts)
-        recent_posts = Post.objects.exclude(
-            Q(user__is_superuser=True) | Q(user__is_staff=True)
-        ).select_related('user__profile').order_by('-created_at')[:6]
+        recent_posts = Post.objects.public().select_related('user__profile').order_by('-created_at')[:6]
         
-        # Get upcoming sessions if they exist
-        try:
-            from exchanges.models import Session
-            upcoming_sessions = Session.objects.filter(
-                Q(seeker=request.user) | Q(helper=request.user),
-                status='pending'
-            ).select_related('skill', 'seeker__profile', 'helper__profile').order_by('scheduled_at')[:3]
-        except:
-            upcoming_sessions = []
+        # Next scheduled sessions, cached per user until one of them changes
+        upcoming_sessions = upcoming_sessions_for(request.user)
         
         context = {
             'recent_posts': recent_posts,
             'upcoming_sessions': upcoming_sessions,
-            'sessions_count': len(upcoming_sessions),
         }
     
     return render(request, "core/home.html", context)
@@ -1,6 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect
+from django.urls import path
 from django.utils.html import format_html
-from .models import CreditWallet, CreditTransaction
+from core.exports import export_response
+from .models import CreditWallet, CreditTransaction, CreditStats, IdempotencyKey, LedgerEntry, BalanceSnapshot
 
 
 @admin.register(CreditWallet)
@@ -16,11 +20,12 @@ class CreditWalletAdmin(admin.ModelAdmin):
     user_email.short_description = 'User'
     
     def balance_display(self, obj):
-        color = 'green' if obj.balance >= 5 else 'red'
+        balance = obj.current_balance
+        color = 'green' if balance >= 5 else 'red'
         return format_html(
             '<strong style="color: {};">{} credits</strong>',
             color,
-            obj.balance
+            balance
         )
     balance_display.short_description = 'Balance'
 
@@ -43,6 +48,24 @@ class CreditTransactionAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_urls(self):
+        export = path(
+            'export/',
+            self.admin_site.admin_view(self.export_view),
+            name='credits_credittransaction_export',
+        )
+        return [export] + super().get_urls()
+
+    def export_view(self, request):
+        """Stream the full table as CSV/NDJSON (?format=, ?start=, ?end=, ?user=)"""
+        if not self.has_view_permission(request):
+            return redirect('admin:index')
+        try:
+            return export_response(request, 'transactions')
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('admin:credits_credittransaction_changelist')
+
     def from_user_email(self, obj):
         return obj.from_user.email if obj.from_user else 'System'
     from_user_email.short_description = 'From'
@@ -67,3 +90,64 @@ class CreditTransactionAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False  # Can't edit transactions
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """Append-only ledger entries (ledger mode)"""
+    list_display = ['id', 'wallet', 'transaction', 'amount', 'created_at']
+    list_filter = ['created_at']
+    search_fields = ['wallet__user__email']
+    readonly_fields = ['wallet', 'transaction', 'amount', 'created_at']
+    ordering = ['-id']
+
+    def has_add_permission(self, request):
+        return False  # Entries are written by transfer_credits only
+
+    def has_change_permission(self, request, obj=None):
+        return False  # Ledger is immutable
+
+
+@admin.register(BalanceSnapshot)
+class BalanceSnapshotAdmin(admin.ModelAdmin):
+    """Folded wallet balances (ledger mode)"""
+    list_display = ['wallet', 'balance', 'last_entry_id', 'as_of', 'created_at']
+    search_fields = ['wallet__user__email']
+    readonly_fields = ['wallet', 'balance', 'last_entry_id', 'as_of', 'created_at']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False  # Taken by the snapshot_balances command
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CreditStats)
+class CreditStatsAdmin(admin.ModelAdmin):
+    """Per-user credit totals (maintained by transfers, rebuilt by rebuild_credit_stats)"""
+    list_display = ['user', 'lifetime_earned', 'lifetime_spent', 'month_net', 'sessions_helped', 'sessions_taken']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'lifetime_earned', 'lifetime_spent', 'month_start', 'month_earned',
+                       'month_spent', 'sessions_helped', 'sessions_taken', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Keys of already-processed transfers and completions"""
+    list_display = ['key', 'scope', 'user', 'transaction', 'session', 'created_at']
+    list_filter = ['scope', 'created_at']
+    search_fields = ['key', 'user__email']
+    readonly_fields = ['user', 'scope', 'key', 'transaction', 'session', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
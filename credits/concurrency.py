@@ -0,0 +1,112 @@
+"""
+Lock ordering, conflict retry and lock-wait accounting for credit transfers
+"""
+import logging
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# Postgres SQLSTATEs that mean "run the whole transaction again"
+RETRYABLE_PGCODES = {
+    "40001",  # serialization_failure
+    "40P01",  # deadlock_detected
+    "55P03",  # lock_not_available (lock_timeout)
+}
+
+
+class LockStats:
+    """Process-wide counters for time spent waiting on wallet row locks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.retries = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+lock_stats = LockStats()
+
+
+class timed_lock_wait:
+    """Context manager that records how long the wrapped lock query blocked"""
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        lock_stats.record_wait(self.seconds)
+        logger.debug("wallet lock wait %.3f ms", self.seconds * 1000)
+        return False
+
+    @property
+    def ms(self):
+        return round(self.seconds * 1000, 3)
+
+
+def is_retryable(exc):
+    """True for deadlocks/serialization failures that a fresh attempt can fix"""
+    pgcode = getattr(exc.__cause__, "pgcode", None) or getattr(exc, "pgcode", None)
+    if pgcode in RETRYABLE_PGCODES:
+        return True
+    # SQLite reports writer contention as a plain OperationalError
+    return "database is locked" in str(exc)
+
+
+def retry_on_conflict(func):
+    """Re-run ``func`` on retryable database conflicts with jittered backoff.
+
+    Only the outermost transaction can be retried: inside an enclosing
+    atomic block the conflict has already aborted the transaction, so the
+    error is re-raised for the outer caller to handle.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = max(1, getattr(settings, "CREDITS_TRANSFER_RETRIES", 3))
+        backoff = getattr(settings, "CREDITS_RETRY_BACKOFF_SECONDS", 0.05)
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if connection.in_atomic_block or not is_retryable(exc):
+                    raise
+                if attempt == attempts:
+                    logger.warning("%s gave up after %d attempts: %s", func.__name__, attempts, exc)
+                    raise ValidationError(
+                        "The system is busy right now. Please try again in a moment."
+                    ) from exc
+                lock_stats.record_retry()
+                time.sleep(backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+    return wrapper
@@ -0,0 +1,137 @@
+"""
+Multi-process load test for transfer_credits and Session.mark_completed.
+
+Run it against a disposable Postgres database (SQLite serialises all writers):
+
+    python manage.py bench_settlements --processes 8 --ops 500
+"""
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import connections, OperationalError
+from credits.management.pool import process_pool
+
+BENCH_DOMAIN = "bench.invalid"
+BENCH_BALANCE = 1_000_000
+
+
+def _bench_users():
+    User = get_user_model()
+    return User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}")
+
+
+def _run_worker(args):
+    mode, user_ids, session_ids, ops, seed = args
+    from credits.concurrency import lock_stats
+    from credits.models import transfer_credits
+    from exchanges.models import Session
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    users = list(User.objects.filter(id__in=user_ids))
+    sessions = list(Session.objects.filter(id__in=session_ids).select_related("requester", "helper"))
+    latencies, errors = [], 0
+
+    for i in range(ops):
+        use_session = mode == "complete" or (mode == "both" and i % 2)
+        started = time.perf_counter()
+        try:
+            if use_session and sessions:
+                session = sessions.pop()
+                session.mark_completed(by_user=session.requester)
+            else:
+                # Few users and random direction maximise opposite-transfer collisions
+                a, b = rng.sample(users, 2)
+                transfer_credits(from_user=a, to_user=b, amount=1, note="bench")
+        except (ValidationError, OperationalError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+    connections.close_all()
+    return latencies, errors, lock_stats.as_dict()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = 'Hammer transfer_credits and Session.mark_completed from several processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--ops', type=int, default=200, help='Operations per process')
+        parser.add_argument('--users', type=int, default=10, help='Size of the contended user pool')
+        parser.add_argument('--mode', choices=['transfer', 'complete', 'both'], default='both')
+        parser.add_argument('--keep', action='store_true', help='Keep the bench users and rows afterwards')
+
+    def handle(self, *args, **options):
+        from credits.models import CreditWallet
+        from exchanges.models import Session
+
+        User = get_user_model()
+        processes, ops = options['processes'], options['ops']
+
+        self._cleanup()
+        users = [
+            User.objects.create_user(f"bench{n}@{BENCH_DOMAIN}", None, email_verified=True)
+            for n in range(max(2, options['users']))
+        ]
+        CreditWallet.objects.filter(user__in=users).update(balance=BENCH_BALANCE)
+        user_ids = [u.id for u in users]
+
+        session_chunks = [[] for _ in range(processes)]
+        if options['mode'] != 'transfer':
+            rng = random.Random(0)
+            for p in range(processes):
+                batch = []
+                for _ in range(ops):
+                    requester, helper = rng.sample(users, 2)
+                    batch.append(Session(requester=requester, helper=helper, title="bench",
+                                         status=Session.Status.ACCEPTED, agreed_amount=5))
+                session_chunks[p] = [s.id for s in Session.objects.bulk_create(batch)]
+
+        jobs = [(options['mode'], user_ids, session_chunks[p], ops, p) for p in range(processes)]
+
+        started = time.perf_counter()
+        with process_pool(processes) as pool:
+            results = pool.map(_run_worker, jobs)
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(l for lat, _, _ in results for l in lat)
+        errors = sum(err for _, err, _ in results)
+        retries = sum(stats['retries'] for _, _, stats in results)
+        lock_wait = sum(stats['total_wait_ms'] for _, _, stats in results)
+        max_wait = max((stats['max_wait_ms'] for _, _, stats in results), default=0)
+
+        self.stdout.write(f"processes={processes} ops/process={ops} mode={options['mode']}")
+        self.stdout.write(f"completed={len(latencies)} errors={errors} retries={retries} wall={elapsed:.2f}s")
+        self.stdout.write(f"throughput={len(latencies) / elapsed:.1f} settlements/s" if elapsed else "throughput=n/a")
+        self.stdout.write(
+            "latency ms: p50={:.2f} p95={:.2f} p99={:.2f} max={:.2f}".format(
+                *(1000 * _percentile(latencies, p) for p in (50, 95, 99, 100))
+            )
+        )
+        self.stdout.write(
+            f"lock wait ms: total={lock_wait:.1f} avg={lock_wait / max(1, len(latencies)):.3f} max={max_wait:.2f}"
+        )
+
+        if not options['keep']:
+            self._cleanup()
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished'))
+
+    def _cleanup(self):
+        from credits.models import CreditTransaction
+
+        users = _bench_users()
+        # Transactions outlive their users (SET_NULL), so remove them explicitly
+        CreditTransaction.objects.filter(from_user__in=users).delete()
+        CreditTransaction.objects.filter(to_user__in=users).delete()
+        users.delete()
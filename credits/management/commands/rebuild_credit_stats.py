@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from datetime import datetime
+from credits.models import CreditStats, CreditTransaction, current_month
+
+User = get_user_model()
+
+STAT_FIELDS = [
+    'lifetime_earned', 'lifetime_spent', 'month_start', 'month_earned',
+    'month_spent', 'sessions_helped', 'sessions_taken', 'updated_at',
+]
+
+
+class Command(BaseCommand):
+    help = 'Recompute CreditStats from CreditTransaction in user-id chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users per chunk')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        month = current_month()
+        month_begins = timezone.make_aware(datetime(month.year, month.month, 1))
+
+        # Transactions after this one are left for transfer_credits / fold_pending_stats
+        last_tx = CreditTransaction.objects.aggregate(last=Max('id'))['last'] or 0
+        transactions = CreditTransaction.objects.filter(id__lte=last_tx)
+
+        last_id, rebuilt = 0, 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            lo, hi = user_ids[0], user_ids[-1]
+            this_month = Q(created_at__gte=month_begins)
+            with_session = Q(session__isnull=False)
+
+            sent = {
+                row['from_user_id']: row
+                for row in transactions.filter(from_user_id__gte=lo, from_user_id__lte=hi)
+                .values('from_user_id')
+                .annotate(total=Sum('amount'), month=Sum('amount', filter=this_month),
+                          sessions=Count('id', filter=with_session))
+            }
+            received = {
+                row['to_user_id']: row
+                for row in transactions.filter(to_user_id__gte=lo, to_user_id__lte=hi)
+                .values('to_user_id')
+                .annotate(total=Sum('amount'), month=Sum('amount', filter=this_month),
+                          sessions=Count('id', filter=with_session))
+            }
+
+            now = timezone.now()
+            rows = []
+            for user_id in user_ids:
+                s, r = sent.get(user_id, {}), received.get(user_id, {})
+                rows.append(CreditStats(
+                    user_id=user_id,
+                    lifetime_earned=r.get('total') or 0,
+                    lifetime_spent=s.get('total') or 0,
+                    month_start=month,
+                    month_earned=r.get('month') or 0,
+                    month_spent=s.get('month') or 0,
+                    sessions_helped=r.get('sessions') or 0,
+                    sessions_taken=s.get('sessions') or 0,
+                    updated_at=now,
+                ))
+            with transaction.atomic():
+                CreditStats.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['user'], update_fields=STAT_FIELDS,
+                )
+
+            rebuilt += len(rows)
+            last_id = hi
+            self.stdout.write(f'  users {lo}-{hi}: {len(rows)} rows')
+
+        # Already counted above, so fold_pending_stats must not add them again
+        transactions.filter(stats_pending=True).update(stats_pending=False)
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt credit stats for {rebuilt} user(s)'))
@@ -0,0 +1,139 @@
+"""
+Check every wallet against its transaction history:
+
+    balance == initial grant + received - sent
+
+Wallets are read in user-id ranges; each range is aggregated in SQL inside
+one read-only snapshot, so the command takes no locks and memory stays
+bounded by --chunk-size. Discrepancies are written as NDJSON, one object per
+line, followed by a {"summary": ...} line.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from credits.management.pool import process_pool
+from credits.models import CreditTransaction, CreditWallet, LedgerEntry, ledger_enabled
+
+
+@contextmanager
+def read_snapshot():
+    """Read-only transaction in which every query sees the same snapshot"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+        yield
+
+
+def reconcile_range(args):
+    """Return ``(wallets_checked, discrepancies)`` for users ``lo <= id < hi``"""
+    lo, hi, initial, skip_staff = args
+    with read_snapshot():
+        wallets = CreditWallet.objects.filter(user_id__gte=lo, user_id__lt=hi)
+        if skip_staff:
+            wallets = wallets.filter(user__is_staff=False, user__is_superuser=False)
+        balances = dict(wallets.values_list('user_id', 'balance'))
+        if not balances:
+            return 0, []
+
+        sent = dict(
+            CreditTransaction.objects.filter(from_user_id__gte=lo, from_user_id__lt=hi)
+            .values('from_user_id').annotate(total=Sum('amount')).values_list('from_user_id', 'total')
+        )
+        received = dict(
+            CreditTransaction.objects.filter(to_user_id__gte=lo, to_user_id__lt=hi)
+            .values('to_user_id').annotate(total=Sum('amount')).values_list('to_user_id', 'total')
+        )
+        ledger = {}
+        if ledger_enabled():
+            # balance is the opening figure in ledger mode; entries sit on top of it
+            ledger = dict(
+                LedgerEntry.objects.filter(wallet__user_id__gte=lo, wallet__user_id__lt=hi)
+                .values('wallet__user_id').annotate(total=Sum('amount'))
+                .values_list('wallet__user_id', 'total')
+            )
+
+    discrepancies = []
+    for user_id, stored in balances.items():
+        balance = stored + (ledger.get(user_id) or 0)
+        expected = initial + (received.get(user_id) or 0) - (sent.get(user_id) or 0)
+        if balance != expected:
+            discrepancies.append({
+                'user_id': user_id,
+                'balance': balance,
+                'expected': expected,
+                'difference': balance - expected,
+                'received': received.get(user_id) or 0,
+                'sent': sent.get(user_id) or 0,
+            })
+    return len(balances), discrepancies
+
+
+class Command(BaseCommand):
+    help = 'Verify wallet balances against the transaction table and report discrepancies as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--initial', type=int,
+                            default=CreditWallet._meta.get_field('balance').default,
+                            help='Credits every wallet started with')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='User ids per chunk')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Worker processes (1 runs in-process)')
+        parser.add_argument('--skip-staff', action='store_true',
+                            help='Ignore staff/superuser wallets (seeded with manual grants)')
+        parser.add_argument('--output', help='Write the report here instead of stdout')
+
+    def handle(self, *args, **options):
+        bounds = CreditWallet.objects.aggregate(lo=Min('user_id'), hi=Max('user_id'))
+        if bounds['lo'] is None:
+            self.stderr.write('No wallets to reconcile.')
+            return
+
+        size = max(1, options['chunk_size'])
+        ranges = [
+            (lo, lo + size, options['initial'], options['skip_staff'])
+            for lo in range(bounds['lo'], bounds['hi'] + 1, size)
+        ]
+
+        out = open(options['output'], 'w') if options['output'] else self.stdout
+        started = time.monotonic()
+        checked = found = 0
+        try:
+            if options['workers'] > 1:
+                with process_pool(options['workers']) as pool:
+                    # Results stream back as chunks finish; nothing is held but the current chunk
+                    for count, discrepancies in pool.imap_unordered(reconcile_range, ranges):
+                        checked += count
+                        found += self._write(out, discrepancies)
+            else:
+                for job in ranges:
+                    count, discrepancies = reconcile_range(job)
+                    checked += count
+                    found += self._write(out, discrepancies)
+
+            out.write(json.dumps({'summary': {
+                'wallets_checked': checked,
+                'discrepancies': found,
+                'chunks': len(ranges),
+                'ledger_mode': ledger_enabled(),
+                'seconds': round(time.monotonic() - started, 2),
+            }}) + '\n')
+        finally:
+            if out is not self.stdout:
+                out.close()
+
+        if found:
+            self.stderr.write(self.style.ERROR(f'✗ Checked {checked} wallet(s), {found} discrepancy(ies)'))
+        else:
+            self.stderr.write(self.style.SUCCESS(f'✓ Checked {checked} wallet(s), no discrepancies'))
+
+    def _write(self, out, discrepancies):
+        for row in discrepancies:
+            out.write(json.dumps(row) + '\n')
+        out.flush()
+        return len(discrepancies)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from credits.models import CreditWallet, LedgerEntry, fold_pending_stats, take_snapshot, snapshot_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Fold ledger entries into per-wallet balance snapshots, and pending transfers into CreditStats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-entries', type=int, default=1,
+                            help='Only snapshot wallets with at least this many new entries')
+        parser.add_argument('--wallet', type=int, help='Snapshot a single wallet id')
+
+    def handle(self, *args, **options):
+        folded, batch = 0, fold_pending_stats()
+        while batch:
+            folded += batch
+            batch = fold_pending_stats()
+        if folded:
+            self.stdout.write(f'Folded {folded} transfer(s) into credit stats.')
+
+        cutoff = snapshot_cutoff()
+        if not cutoff:
+            self.stdout.write('No ledger entries old enough to snapshot.')
+            return
+
+        wallet_ids = LedgerEntry.objects.filter(id__lte=cutoff)
+        if options['wallet']:
+            wallet_ids = wallet_ids.filter(wallet_id=options['wallet'])
+        wallet_ids = wallet_ids.values_list('wallet_id', flat=True).distinct().order_by('wallet_id')
+
+        taken = 0
+        for wallet in CreditWallet.objects.filter(id__in=wallet_ids).iterator():
+            with transaction.atomic():
+                if take_snapshot(wallet, cutoff, min_entries=options['min_entries']):
+                    taken += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Took {taken} snapshot(s) up to entry {cutoff}')
+        )
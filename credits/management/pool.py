@@ -0,0 +1,23 @@
+"""
+Process pools for management commands that fan database work out to workers
+"""
+import multiprocessing
+
+import django
+from django.apps import apps
+from django.db import connections
+
+
+def _worker_init():
+    # Children must open their own database connections, never reuse the parent's socket
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def process_pool(workers):
+    """Return a Pool whose workers each get a fresh database connection"""
+    connections.close_all()
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    return ctx.Pool(workers, initializer=_worker_init)
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0002_alter_creditwallet_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.IntegerField()),
+                ('last_entry_id', models.BigIntegerField()),
+                ('as_of', models.DateTimeField(help_text='created_at of the last folded entry')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='credits.creditwallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', '-last_entry_id'], name='credits_bal_wallet__c49260_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='credits.credittransaction')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='credits.creditwallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', 'id'], name='credits_led_wallet__b5806d_idx'), models.Index(fields=['wallet', 'created_at'], name='credits_led_wallet__b49b5a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0003_ledger_entries'),
+        ('exchanges', '0002_session_duration_session_level_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['from_user', '-created_at', '-id'], name='credits_cre_from_us_7bff61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['to_user', '-created_at', '-id'], name='credits_cre_to_user_3bf6ce_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def backfill_stats(apps, schema_editor):
+    CreditTransaction = apps.get_model('credits', 'CreditTransaction')
+    CreditStats = apps.get_model('credits', 'CreditStats')
+    month = timezone.localdate().replace(day=1)
+    this_month = Q(created_at__gte=timezone.make_aware(timezone.datetime(month.year, month.month, 1)))
+    with_session = Q(session__isnull=False)
+    stats = {}
+    for side, prefix, sessions in (('to_user_id', 'earned', 'sessions_helped'), ('from_user_id', 'spent', 'sessions_taken')):
+        rows = (
+            CreditTransaction.objects.filter(**{f'{side}__isnull': False})
+            .values_list(side).order_by()
+            .annotate(total=Sum('amount'), month=Sum('amount', filter=this_month), n=Count('id', filter=with_session))
+        )
+        for user_id, total, month_total, n in rows:
+            fields = stats.setdefault(user_id, {'month_start': month})
+            fields[f'lifetime_{prefix}'] = total or 0
+            fields[f'month_{prefix}'] = month_total or 0
+            fields[sessions] = n
+    CreditStats.objects.bulk_create(
+        [CreditStats(user_id=user_id, **fields) for user_id, fields in stats.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('credits', '0004_transaction_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('lifetime_earned', models.PositiveIntegerField(default=0)),
+                ('lifetime_spent', models.PositiveIntegerField(default=0)),
+                ('month_start', models.DateField(blank=True, null=True)),
+                ('month_earned', models.PositiveIntegerField(default=0)),
+                ('month_spent', models.PositiveIntegerField(default=0)),
+                ('sessions_helped', models.PositiveIntegerField(default=0)),
+                ('sessions_taken', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Credit stats',
+                'verbose_name_plural': 'Credit stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
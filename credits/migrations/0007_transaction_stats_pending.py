@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credits', '0006_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credittransaction',
+            name='stats_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(condition=models.Q(('stats_pending', True)), fields=['id'], name='credit_tx_stats_pending_idx'),
+        ),
+    ]
@@ -1,51 +1,416 @@
-from django.db import models, transaction as dbtx
+from django.db import models, IntegrityError, transaction as dbtx
+from django.db.models import Max, Sum, Count, Q, F, Case, When, Value, CharField
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from .concurrency import retry_on_conflict, timed_lock_wait
+
+
+def ledger_enabled():
+    """True when transfers append LedgerEntry rows instead of rewriting wallet balances"""
+    return getattr(settings, "CREDITS_LEDGER_MODE", False)
+
 
 class CreditWallet(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wallet")
+    # In ledger mode this is the opening balance; entries are added on top of it.
     balance = models.PositiveIntegerField(default=20)
 
     def __str__(self):
         return f"Wallet({self.user_id}) = {self.balance}"
 
+    @property
+    def current_balance(self):
+        """Spendable balance, whichever mode the ledger is running in"""
+        if ledger_enabled():
+            return ledger_balance(self)
+        return self.balance
+
 class CreditTransaction(models.Model):
     from_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="credits_sent")
     to_user   = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="credits_received")
     amount    = models.PositiveIntegerField()
     note      = models.CharField(max_length=255, blank=True)
     session   = models.ForeignKey("exchanges.Session", on_delete=models.SET_NULL, null=True, blank=True, related_name="credit_transactions")
+    # Ledger-mode transfers leave CreditStats to fold_pending_stats
+    stats_pending = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of each side of a wallet's history
+            models.Index(fields=["from_user", "-created_at", "-id"]),
+            models.Index(fields=["to_user", "-created_at", "-id"]),
+            models.Index(fields=["id"], condition=Q(stats_pending=True), name="credit_tx_stats_pending_idx"),
+        ]
+
     def __str__(self):
         return f"TX {self.id}: {self.from_user_id} -> {self.to_user_id} ({self.amount})"
 
+
+class IdempotencyKey(models.Model):
+    """Outcome of a transfer or completion submitted with a client-generated key"""
+    SCOPES = [
+        ("transfer", "Credit transfer"),
+        ("complete", "Session completion"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    scope = models.CharField(max_length=20, choices=SCOPES)
+    key = models.CharField(max_length=64)
+    transaction = models.ForeignKey(CreditTransaction, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    session = models.ForeignKey("exchanges.Session", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "scope", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.user_id})"
+
+
+def find_idempotency_key(user, scope, key):
+    """Recorded outcome for ``key``, or None; one read on the unique index"""
+    return IdempotencyKey.objects.filter(
+        user=user, scope=scope, key=key
+    ).select_related("transaction", "session").first()
+
+
+def claim_idempotency_key(user, scope, key, **outcome):
+    """Insert ``key`` in the caller's transaction; returns None if it was already used.
+
+    A concurrent request with the same key blocks on the unique index until
+    the first one commits, then lands here and backs off.
+    """
+    try:
+        with dbtx.atomic():
+            return IdempotencyKey.objects.create(user=user, scope=scope, key=key, **outcome)
+    except IntegrityError:
+        return None
+
+
+def current_month():
+    return timezone.localdate().replace(day=1)
+
+
+class CreditStats(models.Model):
+    """Per-user credit totals.
+
+    Updated in the transfer's own transaction, except in ledger mode where
+    ``fold_pending_stats`` applies them in batches (see ``post_transfers``).
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="credit_stats")
+    lifetime_earned = models.PositiveIntegerField(default=0)
+    lifetime_spent = models.PositiveIntegerField(default=0)
+    # Month counters reset lazily on the first transfer of a new month
+    month_start = models.DateField(null=True, blank=True)
+    month_earned = models.PositiveIntegerField(default=0)
+    month_spent = models.PositiveIntegerField(default=0)
+    sessions_helped = models.PositiveIntegerField(default=0)
+    sessions_taken = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Credit stats"
+        verbose_name_plural = "Credit stats"
+
+    def __str__(self):
+        return f"Stats({self.user_id}) +{self.lifetime_earned} -{self.lifetime_spent}"
+
+    @classmethod
+    def for_user(cls, user):
+        """Single-row read; users without transfers get an unsaved zero row"""
+        return cls.objects.filter(user=user).first() or cls(user=user)
+
+    @property
+    def month_net(self):
+        if self.month_start != current_month():
+            return 0
+        return self.month_earned - self.month_spent
+
+
+def record_transfer_stats(transfers, this_month=True):
+    """Fold transfers into CreditStats; call inside a transaction.
+
+    Pass ``this_month=False`` for transfers made in an earlier month, which
+    only count towards the lifetime totals.
+    """
+    totals = defaultdict(lambda: {"earned": 0, "spent": 0, "helped": 0, "taken": 0})
+    for t in transfers:
+        totals[t.to_user_id]["earned"] += t.amount
+        totals[t.from_user_id]["spent"] += t.amount
+        if t.session_id:
+            totals[t.to_user_id]["helped"] += 1
+            totals[t.from_user_id]["taken"] += 1
+    totals.pop(None, None)  # a deleted user's side of an old transaction
+
+    CreditStats.objects.bulk_create(
+        [CreditStats(user_id=user_id) for user_id in totals], ignore_conflicts=True
+    )
+    month = current_month()
+    # Ascending user id, same as the wallet locks, so stats rows never deadlock
+    for user_id in sorted(totals):
+        t = totals[user_id]
+        fields = {}
+        if this_month:
+            fields = {
+                "month_earned": Case(When(month_start=month, then=F("month_earned") + t["earned"]), default=Value(t["earned"])),
+                "month_spent": Case(When(month_start=month, then=F("month_spent") + t["spent"]), default=Value(t["spent"])),
+                "month_start": month,
+            }
+        CreditStats.objects.filter(user_id=user_id).update(
+            lifetime_earned=F("lifetime_earned") + t["earned"],
+            lifetime_spent=F("lifetime_spent") + t["spent"],
+            sessions_helped=F("sessions_helped") + t["helped"],
+            sessions_taken=F("sessions_taken") + t["taken"],
+            updated_at=timezone.now(),
+            **fields,
+        )
+
+
+def fold_pending_stats(batch_size=1000):
+    """Apply CreditStats for up to ``batch_size`` ledger-mode transactions; returns how many.
+
+    Claims the oldest ``stats_pending`` rows with SKIP LOCKED, so it never
+    waits on a transfer in flight, and clears the flag in the same
+    transaction as the stats UPDATEs.
+    """
+    with dbtx.atomic():
+        txs = list(
+            CreditTransaction.objects.select_for_update(skip_locked=True)
+            .filter(stats_pending=True).order_by("id")
+            .only("id", "from_user_id", "to_user_id", "amount", "session_id", "created_at")[:batch_size]
+        )
+        if not txs:
+            return 0
+        month = current_month()
+        current, earlier = [], []
+        for tx in txs:
+            made_in = timezone.localtime(tx.created_at).date().replace(day=1)
+            (current if made_in >= month else earlier).append(tx)
+        if current:
+            record_transfer_stats(current)
+        if earlier:
+            record_transfer_stats(earlier, this_month=False)
+        CreditTransaction.objects.filter(pk__in=[tx.pk for tx in txs]).update(stats_pending=False)
+    return len(txs)
+
+
+class LedgerEntry(models.Model):
+    """Immutable half of a double-entry transfer: negative debits, positive credits"""
+    wallet = models.ForeignKey(CreditWallet, on_delete=models.CASCADE, related_name="entries")
+    transaction = models.ForeignKey(CreditTransaction, on_delete=models.CASCADE, related_name="entries")
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "id"]),
+            models.Index(fields=["wallet", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Entry {self.id}: wallet {self.wallet_id} {self.amount:+d}"
+
+
+class BalanceSnapshot(models.Model):
+    """Wallet balance folded up to and including ``last_entry_id``"""
+    wallet = models.ForeignKey(CreditWallet, on_delete=models.CASCADE, related_name="snapshots")
+    balance = models.IntegerField()
+    last_entry_id = models.BigIntegerField()
+    as_of = models.DateTimeField(help_text="created_at of the last folded entry")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet", "-last_entry_id"]),
+        ]
+
+    def __str__(self):
+        return f"Snapshot({self.wallet_id}) = {self.balance} @ entry {self.last_entry_id}"
+
+
+def wallet_history(user):
+    """Sent and received transactions as two querysets, each annotated with ``direction``.
+
+    Page them with ``paginate_keyset_merged``: each side then walks its own
+    ``(from_user|to_user, -created_at, -id)`` index instead of the database
+    sorting an OR of both.
+    """
+    base = CreditTransaction.objects.select_related("from_user", "to_user")
+    return [
+        base.filter(from_user=user).annotate(direction=Value("sent", output_field=CharField())),
+        base.filter(to_user=user).annotate(direction=Value("received", output_field=CharField())),
+    ]
+
+
+def ledger_balance(wallet, at=None):
+    """Latest snapshot plus the entries after it; pass ``at`` to audit a past balance"""
+    snapshots = wallet.snapshots.order_by("-last_entry_id")
+    entries = wallet.entries.all()
+    if at is not None:
+        snapshots = snapshots.filter(as_of__lte=at)
+        entries = entries.filter(created_at__lte=at)
+
+    snapshot = snapshots.first()
+    if snapshot is not None:
+        base = snapshot.balance
+        entries = entries.filter(id__gt=snapshot.last_entry_id)
+    else:
+        base = wallet.balance
+    return base + (entries.aggregate(total=Sum("amount"))["total"] or 0)
+
+
+def take_snapshot(wallet, upto_entry_id, min_entries=1):
+    """Fold a wallet's entries up to ``upto_entry_id`` into a new snapshot.
+
+    Returns the snapshot, or None when fewer than ``min_entries`` entries
+    arrived since the previous one.
+    """
+    previous = wallet.snapshots.order_by("-last_entry_id").first()
+    entries = wallet.entries.filter(id__lte=upto_entry_id)
+    base = wallet.balance
+    if previous is not None:
+        base = previous.balance
+        entries = entries.filter(id__gt=previous.last_entry_id)
+
+    folded = entries.aggregate(total=Sum("amount"), count=Count("id"), last=Max("id"))
+    if not folded["count"] or folded["count"] < min_entries:
+        return None
+
+    last_entry = LedgerEntry.objects.only("created_at").get(pk=folded["last"])
+    return BalanceSnapshot.objects.create(
+        wallet=wallet,
+        balance=base + folded["total"],
+        last_entry_id=folded["last"],
+        as_of=last_entry.created_at,
+    )
+
+
+def snapshot_cutoff():
+    """Highest entry id that is safe to fold.
+
+    Entries younger than CREDITS_SNAPSHOT_LAG_SECONDS are skipped so a
+    transaction that took a lower id but commits late is never left behind
+    a snapshot.
+    """
+    lag = getattr(settings, "CREDITS_SNAPSHOT_LAG_SECONDS", 60)
+    cutoff = LedgerEntry.objects.filter(
+        created_at__lte=timezone.now() - timedelta(seconds=lag)
+    ).aggregate(last=Max("id"))["last"]
+    return cutoff or 0
+
+
 def get_wallet(user):
     return CreditWallet.objects.select_for_update().get(user=user)
 
-def transfer_credits(*, from_user, to_user, amount, note="", session=None):
+def lock_wallets(*users):
+    """Lock the users' wallets in ascending user id order; returns ``(wallets_by_user_id, wait_ms)``.
+
+    A single ordered ``SELECT ... FOR UPDATE`` means two opposite transfers
+    always queue on the same row first instead of deadlocking.
+    """
+    user_ids = sorted({getattr(u, "pk", u) for u in users})
+    with timed_lock_wait() as timer:
+        wallets = {
+            w.user_id: w
+            for w in CreditWallet.objects.select_for_update().filter(user_id__in=user_ids).order_by("user_id")
+        }
+    if len(wallets) != len(user_ids):
+        raise CreditWallet.DoesNotExist("Wallet not found.")
+    return wallets, timer.ms
+
+Transfer = namedtuple("Transfer", "from_user_id to_user_id amount note session_id")
+
+def available_balances(wallets):
+    """Spendable balance per user id for wallets returned by lock_wallets()"""
+    return {user_id: w.current_balance for user_id, w in wallets.items()}
+
+def post_transfers(transfers, wallets):
+    """Write already-validated transfers; call inside the transaction holding the locks.
+
+    Inserts every CreditTransaction in one statement, then applies either
+    one net delta per wallet (one UPDATE for all wallets) plus the
+    CreditStats, or, in ledger mode, bulk-inserts the debit/credit entries.
+    Ledger mode leaves the stats to ``fold_pending_stats`` so a popular
+    payee's stats row is not a lock every concurrent payer queues on.
+    """
+    ledger = ledger_enabled()
+    txs = CreditTransaction.objects.bulk_create([
+        CreditTransaction(
+            from_user_id=t.from_user_id,
+            to_user_id=t.to_user_id,
+            amount=t.amount,
+            note=t.note,
+            session_id=t.session_id,
+            stats_pending=ledger,
+        )
+        for t in transfers
+    ])
+
+    if ledger:
+        entries = []
+        for t, tx in zip(transfers, txs):
+            entries.append(LedgerEntry(wallet=wallets[t.from_user_id], transaction=tx, amount=-t.amount))
+            entries.append(LedgerEntry(wallet=wallets[t.to_user_id], transaction=tx, amount=t.amount))
+        LedgerEntry.objects.bulk_create(entries)
+        return txs
+
+    record_transfer_stats(transfers)
+    deltas = defaultdict(int)
+    for t in transfers:
+        deltas[t.from_user_id] -= t.amount
+        deltas[t.to_user_id] += t.amount
+    changed = []
+    for user_id, delta in deltas.items():
+        if delta:
+            wallets[user_id].balance += delta
+            changed.append(wallets[user_id])
+    CreditWallet.objects.bulk_update(changed, ["balance"])
+    return txs
+
+@retry_on_conflict
+def transfer_credits(*, from_user, to_user, amount, note="", session=None, idempotency_key=None):
+    """Move ``amount`` credits; repeating an ``idempotency_key`` returns the first transaction"""
+    if idempotency_key:
+        prior = find_idempotency_key(from_user, "transfer", idempotency_key)
+        if prior is not None:
+            return prior.transaction
+
     if amount <= 0:
         raise ValidationError("Amount must be positive.")
     if from_user == to_user:
         raise ValidationError("Cannot transfer credits to yourself.")
 
     with dbtx.atomic():
-        from_w = get_wallet(from_user)
-        to_w = get_wallet(to_user)
+        claim = None
+        if idempotency_key:
+            claim = claim_idempotency_key(from_user, "transfer", idempotency_key)
+            if claim is None:
+                return find_idempotency_key(from_user, "transfer", idempotency_key).transaction
+
+        if ledger_enabled():
+            # Only the payer's row is locked (and never rewritten) so concurrent
+            # spends cannot overdraw it; the payee is touched by inserts alone.
+            wallets, wait_ms = lock_wallets(from_user)
+            wallets[to_user.pk] = CreditWallet.objects.only("id", "user_id").get(user=to_user)
+        else:
+            wallets, wait_ms = lock_wallets(from_user, to_user)
 
-        if from_w.balance < amount:
+        if wallets[from_user.pk].current_balance < amount:
             raise ValidationError("Insufficient balance.")
 
-        from_w.balance -= amount
-        to_w.balance += amount
-        from_w.save(update_fields=["balance"])
-        to_w.save(update_fields=["balance"])
-
-        tx = CreditTransaction.objects.create(
-            from_user=from_user,
-            to_user=to_user,
-            amount=amount,
-            note=note,
-            session=session,
+        tx, = post_transfers(
+            [Transfer(from_user.pk, to_user.pk, amount, note, getattr(session, "pk", None))],
+            wallets,
         )
+        if claim is not None:
+            claim.transaction = tx
+            claim.save(update_fields=["transaction"])
+        tx.lock_wait_ms = wait_ms
         return tx
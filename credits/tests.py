@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from core.pagination import paginate_keyset_merged
+
+from .models import (
+    CreditStats, CreditTransaction, CreditWallet, IdempotencyKey, LedgerEntry,
+    Transfer, fold_pending_stats, ledger_balance, lock_wallets, post_transfers, take_snapshot, transfer_credits,
+    wallet_history,
+)
+
+User = get_user_model()
+
+
+class TransferTestMixin:
+    def setUp(self):
+        self.alice = User.objects.create_user("alice@example.com", "pw")
+        self.bob = User.objects.create_user("bob@example.com", "pw")
+        CreditWallet.objects.filter(user__in=[self.alice, self.bob]).update(balance=20)
+
+    def balance(self, user):
+        return CreditWallet.objects.get(user=user).current_balance
+
+
+class TransferCreditsTests(TransferTestMixin, TestCase):
+    def test_moves_credits_and_records_stats(self):
+        tx = transfer_credits(from_user=self.alice, to_user=self.bob, amount=5, note="Thanks")
+
+        self.assertEqual(tx.amount, 5)
+        self.assertEqual(self.balance(self.alice), 15)
+        self.assertEqual(self.balance(self.bob), 25)
+        self.assertEqual(CreditStats.objects.get(user=self.alice).lifetime_spent, 5)
+        self.assertEqual(CreditStats.objects.get(user=self.bob).lifetime_earned, 5)
+
+    def test_insufficient_balance_is_rejected(self):
+        with self.assertRaisesMessage(ValidationError, "Insufficient balance."):
+            transfer_credits(from_user=self.alice, to_user=self.bob, amount=21)
+
+        self.assertEqual(self.balance(self.alice), 20)
+        self.assertFalse(CreditTransaction.objects.exists())
+
+    def test_rejects_non_positive_and_self_transfers(self):
+        with self.assertRaises(ValidationError):
+            transfer_credits(from_user=self.alice, to_user=self.bob, amount=0)
+        with self.assertRaises(ValidationError):
+            transfer_credits(from_user=self.alice, to_user=self.alice, amount=1)
+
+    def test_repeated_idempotency_key_moves_credits_once(self):
+        first = transfer_credits(from_user=self.alice, to_user=self.bob, amount=5, idempotency_key="k1")
+        again = transfer_credits(from_user=self.alice, to_user=self.bob, amount=5, idempotency_key="k1")
+
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual(CreditTransaction.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().transaction_id, first.pk)
+        self.assertEqual(self.balance(self.alice), 15)
+
+    def test_same_key_from_another_payer_is_a_new_transfer(self):
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=5, idempotency_key="k1")
+        transfer_credits(from_user=self.bob, to_user=self.alice, amount=5, idempotency_key="k1")
+
+        self.assertEqual(CreditTransaction.objects.count(), 2)
+
+    def test_post_transfers_nets_deltas_per_wallet(self):
+        wallets, _ = lock_wallets(self.alice, self.bob)
+        post_transfers([
+            Transfer(self.alice.pk, self.bob.pk, 7, "", None),
+            Transfer(self.bob.pk, self.alice.pk, 3, "", None),
+        ], wallets)
+
+        self.assertEqual(self.balance(self.alice), 16)
+        self.assertEqual(self.balance(self.bob), 24)
+        self.assertEqual(CreditTransaction.objects.count(), 2)
+
+
+class WalletHistoryTests(TransferTestMixin, TestCase):
+    def test_pages_both_sides_newest_first_without_gaps(self):
+        carol = User.objects.create_user("carol@example.com", "pw")
+        made = []
+        for i in range(7):
+            payer, payee = (self.alice, self.bob) if i % 2 else (self.bob, self.alice)
+            made.append(transfer_credits(from_user=payer, to_user=payee, amount=1).pk)
+        transfer_credits(from_user=self.bob, to_user=carol, amount=1)
+
+        seen, directions, cursor = [], {}, None
+        while True:
+            page = paginate_keyset_merged(wallet_history(self.alice), cursor, per_page=3)
+            seen += [tx.pk for tx in page]
+            directions.update({tx.pk: tx.direction for tx in page})
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, sorted(made, reverse=True))
+        self.assertEqual(directions[made[0]], "received")
+        self.assertEqual(directions[made[1]], "sent")
+
+
+@override_settings(CREDITS_LEDGER_MODE=True)
+class LedgerModeTests(TransferTestMixin, TestCase):
+    def entry_total(self, user):
+        wallet = CreditWallet.objects.get(user=user)
+        return wallet.balance + (wallet.entries.aggregate(total=Sum("amount"))["total"] or 0)
+
+    def test_transfer_appends_entries_without_rewriting_balances(self):
+        tx = transfer_credits(from_user=self.alice, to_user=self.bob, amount=5)
+
+        self.assertEqual(CreditWallet.objects.get(user=self.alice).balance, 20)
+        self.assertEqual(sorted(LedgerEntry.objects.filter(transaction=tx).values_list("amount", flat=True)), [-5, 5])
+        self.assertEqual(self.balance(self.alice), 15)
+        self.assertEqual(self.balance(self.bob), 25)
+
+    def test_stats_are_folded_after_the_transfer(self):
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=5)
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=2)
+        self.assertFalse(CreditStats.objects.exists())
+
+        self.assertEqual(fold_pending_stats(), 2)
+        self.assertEqual(fold_pending_stats(), 0)
+
+        stats = CreditStats.objects.get(user=self.bob)
+        self.assertEqual((stats.lifetime_earned, stats.month_earned), (7, 7))
+        self.assertEqual(CreditStats.objects.get(user=self.alice).lifetime_spent, 7)
+
+    def test_stats_from_an_earlier_month_only_count_for_lifetime(self):
+        tx = transfer_credits(from_user=self.alice, to_user=self.bob, amount=5)
+        CreditTransaction.objects.filter(pk=tx.pk).update(created_at=tx.created_at - timedelta(days=40))
+
+        fold_pending_stats()
+
+        stats = CreditStats.objects.get(user=self.bob)
+        self.assertEqual((stats.lifetime_earned, stats.month_earned), (5, 0))
+
+    def test_insufficient_balance_counts_ledger_entries(self):
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=15)
+        with self.assertRaisesMessage(ValidationError, "Insufficient balance."):
+            transfer_credits(from_user=self.alice, to_user=self.bob, amount=6)
+
+        self.assertEqual(self.balance(self.alice), 5)
+
+    def test_balance_after_snapshot_matches_sum_of_entries(self):
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=4)
+        transfer_credits(from_user=self.bob, to_user=self.alice, amount=1)
+        wallet = CreditWallet.objects.get(user=self.alice)
+        snapshot = take_snapshot(wallet, LedgerEntry.objects.latest("id").pk)
+        transfer_credits(from_user=self.alice, to_user=self.bob, amount=2)
+
+        self.assertEqual(snapshot.balance, 17)
+        self.assertEqual(ledger_balance(wallet), self.entry_total(self.alice))
+        self.assertEqual(ledger_balance(wallet), 15)
+        self.assertIsNone(take_snapshot(wallet, snapshot.last_entry_id))
+
+    def test_balance_at_a_past_time_ignores_later_entries(self):
+        tx = transfer_credits(from_user=self.alice, to_user=self.bob, amount=4)
+        later = transfer_credits(from_user=self.alice, to_user=self.bob, amount=3)
+        then = LedgerEntry.objects.filter(transaction=tx).latest("created_at").created_at
+        LedgerEntry.objects.filter(transaction=later).update(created_at=then + timedelta(days=1))
+
+        wallet = CreditWallet.objects.get(user=self.alice)
+        self.assertEqual(ledger_balance(wallet, at=then), 16)
+        self.assertEqual(ledger_balance(wallet), 13)
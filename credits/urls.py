@@ -5,5 +5,6 @@ from . import views
 app_name = "credits"
 urlpatterns = [
     path("wallet/", views.wallet_view, name="wallet"),
+    path("wallet/history/", views.wallet_history_api, name="history"),
     path("transfer/", views.transfer_view, name="transfer"),
 ]
@@ -1,39 +1,59 @@
+import uuid
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from .models import CreditWallet, CreditTransaction, transfer_credits
+from django.http import JsonResponse
+from core.pagination import paginate_keyset_merged
+from exchanges.models import pending_settlements
+from skills.suggestions import suggest_helpers
+from .models import CreditStats, CreditWallet, transfer_credits, wallet_history
 
 User = get_user_model()
 
+HISTORY_PAGE_SIZE = 20
+
+
 @login_required
 def wallet_view(request):
     """View user's credit wallet and transaction history"""
     wallet, created = CreditWallet.objects.get_or_create(user=request.user)
     
-    # Get transactions where user sent credits
-    txs_sent = CreditTransaction.objects.filter(
-        from_user=request.user
-    ).select_related('to_user').order_by('-created_at')
-    
-    # Get transactions where user received credits
-    txs_received = CreditTransaction.objects.filter(
-        to_user=request.user
-    ).select_related('from_user').order_by('-created_at')
-    
-    # Combine and sort all transactions
-    all_txs = list(txs_sent) + list(txs_received)
-    all_txs.sort(key=lambda x: x.created_at, reverse=True)
+    # Sent and received read separately on their own indexes, merged one page at a time
+    page = paginate_keyset_merged(wallet_history(request.user), request.GET.get("cursor"), HISTORY_PAGE_SIZE)
     
     return render(request, "credits/wallet.html", {
         "wallet": wallet,
-        "transactions": all_txs,
-        "txs_sent": txs_sent,
-        "txs_received": txs_received,
+        "stats": CreditStats.for_user(request.user),
+        "pending": pending_settlements(request.user)[:10],
+        "transactions": page.items,
+        "next_cursor": page.next_cursor,
     })
 
 
+@login_required
+def wallet_history_api(request):
+    """JSON page of the wallet history for infinite scroll"""
+    page = paginate_keyset_merged(wallet_history(request.user), request.GET.get("cursor"), HISTORY_PAGE_SIZE)
+    
+    results = []
+    for t in page:
+        counterparty = t.to_user if t.direction == "sent" else t.from_user
+        results.append({
+            "id": t.id,
+            "direction": t.direction,
+            "amount": t.amount,
+            "counterparty": counterparty.email if counterparty else None,
+            "note": t.note,
+            "session_id": t.session_id,
+            "created_at": t.created_at.isoformat(),
+        })
+    
+    return JsonResponse({"results": results, "next_cursor": page.next_cursor})
+
+
 @login_required
 def transfer_view(request):
     """Transfer credits to another user.
@@ -52,14 +72,12 @@ def transfer_view(request):
     initial_note = (request.GET.get("note") or "").strip()
 
     context = {
-        "suggested_users": User.objects.exclude(
-            id=request.user.id
-        ).filter(
-            email_verified=True
-        ).select_related("profile")[:10],
+        "suggested_users": suggest_helpers(request.user),
         "to_email": initial_to,
         "amount": initial_amount,
         "note": initial_note,
+        # Resubmitting this form (double click, browser retry) reuses the key
+        "idempotency_key": uuid.uuid4().hex,
     }
 
     if request.method == "POST":
@@ -72,6 +90,9 @@ def transfer_view(request):
             return render(request, "credits/transfer.html", context)
 
         note = request.POST.get("note", "").strip()
+        idempotency_key = request.POST.get("idempotency_key", "").strip()[:64] or None
+        if idempotency_key:
+            context["idempotency_key"] = idempotency_key
 
         # Validate inputs
         if not to_email:
@@ -86,7 +107,7 @@ def transfer_view(request):
 
         try:
             # Find recipient user
-            to_user = User.objects.get(email__iexact=to_email)
+            to_user = User.objects.get_by_email(to_email)
 
             # Perform transfer
             transfer_credits(
@@ -94,6 +115,7 @@ def transfer_view(request):
                 to_user=to_user,
                 amount=amount,
                 note=note,
+                idempotency_key=idempotency_key,
             )
 
             messages.success(request, f"Successfully transferred {amount} credits to {to_email}.")
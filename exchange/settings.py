@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     "profiles.apps.ProfilesConfig",
     "credits.apps.CreditsConfig",
     "exchanges.apps.ExchangesConfig",
+    "search.apps.SearchConfig",  # Full-text search documents
 ]
 
 MIDDLEWARE = [
@@ -75,6 +76,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "django.template.context_processors.media",
+                "exchanges.context_processors.session_counters",
             ],
         },
     },
@@ -106,6 +108,57 @@ else:
         }
     }
 
+# Cache
+# Local memory by default (per process). Set REDIS_URL to share it between workers,
+# which per-user dashboard caches need once more than one process serves requests.
+# RedisCache needs the redis package (requirements.txt); docker-compose runs a server.
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Search results live in their own alias so they can be sized and evicted apart
+# from everything else: Redis when REDIS_URL is set, else files under
+# SEARCH_CACHE_DIR if given, else local memory.
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", "300"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "")
+if REDIS_URL:
+    CACHES["search"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "search",
+        "TIMEOUT": SEARCH_CACHE_TIMEOUT,
+    }
+elif SEARCH_CACHE_DIR:
+    CACHES["search"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": SEARCH_CACHE_DIR,
+        "TIMEOUT": SEARCH_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+else:
+    CACHES["search"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "search",
+        "TIMEOUT": SEARCH_CACHE_TIMEOUT,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+
+# Post view counts are buffered and written in batches (posts.view_counter):
+# "cache" keeps pending hits in the shared cache, "process" in each worker.
+POST_VIEW_BUFFER = os.getenv("POST_VIEW_BUFFER", "cache" if REDIS_URL else "process")
+POST_VIEW_FLUSH_SECONDS = float(os.getenv("POST_VIEW_FLUSH_SECONDS", "10"))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -185,6 +238,20 @@ CORS_ALLOW_CREDENTIALS = True
 # ============ Credit System Settings ============
 INITIAL_CREDITS = 10  # Credits given to new users
 
+# Ledger mode: transfers append immutable LedgerEntry rows instead of rewriting
+# CreditWallet.balance, which then holds each wallet's opening balance.
+# Run `manage.py snapshot_balances` periodically to keep balance reads cheap.
+CREDITS_LEDGER_MODE = os.getenv("CREDITS_LEDGER_MODE", "False").lower() in ("true", "1", "yes")
+CREDITS_SNAPSHOT_LAG_SECONDS = int(os.getenv("CREDITS_SNAPSHOT_LAG_SECONDS", "60"))
+
+# Deadlock/serialization failures in transfers are retried this many times
+CREDITS_TRANSFER_RETRIES = int(os.getenv("CREDITS_TRANSFER_RETRIES", "3"))
+CREDITS_RETRY_BACKOFF_SECONDS = 0.05
+
+# Queue session completions for `manage.py run_settlements` instead of
+# transferring credits inside the web request
+SESSION_ASYNC_SETTLEMENT = os.getenv("SESSION_ASYNC_SETTLEMENT", "False").lower() in ("true", "1", "yes")
+
 # ============ Admin Panel Settings ============
 ADMIN_URL = "admin/"  # Change to something secret in production
 
@@ -1,15 +1,20 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Session
+from core.exports import export_response
+from .models import AvailabilityWindow, Session, SessionCounters, SettlementJob
 
 
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
     """Session management"""
     list_display = ['title', 'requester_email', 'helper_email', 'status_badge', 'credits', 'created_at']
-    list_filter = ['status', 'level', 'created_at']
+    list_filter = ['status', 'level', 'created_at', ('expired_at', admin.EmptyFieldListFilter)]
     search_fields = ['title', 'requester__email', 'helper__email']
-    readonly_fields = ['requester', 'helper', 'agreed_amount', 'created_at', 'updated_at']
+    readonly_fields = ['requester', 'helper', 'agreed_amount', 'expired_at', 'created_at', 'updated_at']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -20,13 +25,31 @@ class SessionAdmin(admin.ModelAdmin):
             'fields': ('title', 'description', 'duration', 'level')
         }),
         ('Status & Credits', {
-            'fields': ('status', 'agreed_amount')
+            'fields': ('status', 'agreed_amount', 'expired_at')
         }),
         ('Timestamps', {
             'fields': ('scheduled_time', 'created_at', 'updated_at')
         }),
     )
     
+    def get_urls(self):
+        export = path(
+            'export/',
+            self.admin_site.admin_view(self.export_view),
+            name='exchanges_session_export',
+        )
+        return [export] + super().get_urls()
+
+    def export_view(self, request):
+        """Stream the full table as CSV/NDJSON (?format=, ?start=, ?end=, ?user=)"""
+        if not self.has_view_permission(request):
+            return redirect('admin:index')
+        try:
+            return export_response(request, 'sessions')
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('admin:exchanges_session_changelist')
+
     def requester_email(self, obj):
         return obj.requester.email
     requester_email.short_description = 'Requester'
@@ -53,3 +76,44 @@ class SessionAdmin(admin.ModelAdmin):
     def credits(self, obj):
         return format_html('<strong>{} credits</strong>', obj.agreed_amount)
     credits.short_description = 'Credits'
+
+
+@admin.register(SettlementJob)
+class SettlementJobAdmin(admin.ModelAdmin):
+    """Queued session completions (drained by run_settlements)"""
+    list_display = ['session', 'status', 'attempts', 'last_error', 'available_at', 'processed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['session__title', 'session__requester__email', 'session__helper__email']
+    readonly_fields = ['session', 'requested_by', 'attempts', 'last_error', 'created_at', 'processed_at']
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=SettlementJob.Status.DONE).update(
+            status=SettlementJob.Status.QUEUED, attempts=0, available_at=timezone.now()
+        )
+        self.message_user(request, f"Requeued {updated} job(s).")
+    requeue.short_description = 'Requeue selected jobs'
+
+
+@admin.register(AvailabilityWindow)
+class AvailabilityWindowAdmin(admin.ModelAdmin):
+    list_display = ['helper', 'start', 'end', 'created_at']
+    search_fields = ['helper__email']
+    list_filter = ['start']
+    raw_id_fields = ['helper']
+
+
+@admin.register(SessionCounters)
+class SessionCountersAdmin(admin.ModelAdmin):
+    """Per-user session badges (maintained on every status change, rebuilt by rebuild_session_counters)"""
+    list_display = ['user', 'requested_pending', 'requested_accepted', 'requested_completed',
+                    'helping_pending', 'helping_accepted', 'helping_completed']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'requested_pending', 'requested_accepted', 'requested_completed',
+                       'helping_pending', 'helping_accepted', 'helping_completed', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,143 @@
+"""
+Helper availability: booking conflict checks and free-slot search.
+
+A session occupies ``[scheduled_time, ends_at)``. Overlap checks are a single
+range query on the ``(helper, scheduled_time, ends_at)`` index; free slots are
+found by merging the helper's bookings into busy intervals once and sweeping
+them against the published windows, instead of probing slot by slot.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AvailabilityWindow, Session
+
+# Statuses that hold a helper's time
+BLOCKING_STATUSES = (Session.Status.PENDING, Session.Status.ACCEPTED)
+LONGEST_SESSION = timedelta(minutes=max(int(d) for d in Session.Duration.values))
+SLOT_STEP = timedelta(minutes=30)
+
+
+def merge_intervals(intervals):
+    """Merge overlapping or touching ``(start, end)`` pairs into a sorted list"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def bookings_between(helper, start, end, exclude_pk=None):
+    """Blocking sessions of ``helper`` that overlap ``[start, end)``"""
+    # A booking can only overlap if it started less than one session-length
+    # before ``start``, which keeps the scheduled_time range on the index tight
+    qs = Session.objects.filter(
+        helper=helper,
+        status__in=BLOCKING_STATUSES,
+        scheduled_time__gt=start - LONGEST_SESSION,
+        scheduled_time__lt=end,
+        ends_at__gt=start,
+    )
+    if exclude_pk:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs
+
+
+def windows_between(helper, start, end):
+    return AvailabilityWindow.objects.filter(helper=helper, end__gt=start, start__lt=end)
+
+
+def publishes_availability(helper):
+    """False for helpers who never published a window; they can be booked at any time"""
+    return AvailabilityWindow.objects.filter(helper=helper).exists()
+
+
+def check_booking(session):
+    """Raise ValidationError if ``session``'s slot is taken or outside the helper's availability"""
+    if session.scheduled_time is None:
+        return
+    start, end = session.scheduled_time, session.compute_ends_at()
+    if start < timezone.now():
+        raise ValidationError("Sessions can't be scheduled in the past.")
+    if bookings_between(session.helper_id, start, end, exclude_pk=session.pk).exists():
+        raise ValidationError("The helper already has a session booked at that time.")
+    if not publishes_availability(session.helper_id):
+        return
+    if not AvailabilityWindow.objects.filter(helper_id=session.helper_id, start__lte=start, end__gte=end).exists():
+        raise ValidationError("That time is outside the helper's availability.")
+
+
+def book_session(session):
+    """Validate and save a new or rescheduled session without double-booking its helper"""
+    User = get_user_model()
+    with transaction.atomic():
+        # Serialise bookings per helper so two requests can't both pass the check
+        User.objects.select_for_update().filter(pk=session.helper_id).first()
+        check_booking(session)
+        session.save()
+    return session
+
+
+def add_window(helper, start, end):
+    """Publish ``[start, end)``, folding it into any window it overlaps or touches"""
+    if end <= start:
+        raise ValidationError("The window must end after it starts.")
+    with transaction.atomic():
+        touching = list(
+            AvailabilityWindow.objects.select_for_update()
+            .filter(helper=helper, end__gte=start, start__lte=end)
+        )
+        if touching:
+            start = min([start] + [w.start for w in touching])
+            end = max([end] + [w.end for w in touching])
+            AvailabilityWindow.objects.filter(pk__in=[w.pk for w in touching]).delete()
+        return AvailabilityWindow.objects.create(helper=helper, start=start, end=end)
+
+
+def _round_up(moment, step=SLOT_STEP):
+    epoch = moment.replace(minute=0, second=0, microsecond=0)
+    steps = -(-(moment - epoch) // step)
+    return epoch + steps * step
+
+
+def free_slots(helper, duration, count=5, after=None, horizon=timedelta(days=14)):
+    """Next ``count`` bookable ``(start, end)`` slots of ``duration`` minutes.
+
+    Two queries: the windows and the bookings in the horizon. Bookings are
+    merged into busy intervals and swept against the windows in one pass.
+    A helper with no published windows is free across the whole horizon,
+    matching ``check_booking``.
+    """
+    length = timedelta(minutes=int(duration))
+    after = _round_up(after or timezone.now())
+    until = after + horizon
+
+    windows = merge_intervals(windows_between(helper, after, until).values_list("start", "end"))
+    if not windows and not publishes_availability(helper):
+        windows = [(after, until)]
+    busy = merge_intervals(
+        bookings_between(helper, after, until).values_list("scheduled_time", "ends_at")
+    )
+
+    slots = []
+    b = 0
+    for win_start, win_end in windows:
+        cursor = _round_up(max(win_start, after))
+        while cursor + length <= win_end and len(slots) < count:
+            # Skip busy intervals that end before the candidate slot
+            while b < len(busy) and busy[b][1] <= cursor:
+                b += 1
+            if b < len(busy) and busy[b][0] < cursor + length:
+                cursor = _round_up(busy[b][1])
+                continue
+            slots.append((cursor, cursor + length))
+            cursor += length
+        if len(slots) >= count:
+            break
+    return slots
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+from .models import SessionCounters
+
+
+def session_counters(request):
+    """Expose the user's SessionCounters row; fetched only if a template reads it"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {"session_counters": SimpleLazyObject(lambda: SessionCounters.for_user(user))}
@@ -0,0 +1,49 @@
+"""
+Per-user "upcoming sessions" widget for the home page.
+
+The list is cached per user and dropped whenever one of the user's sessions
+changes state (see ``Session.transition`` and ``sessions_changed``), so a
+dashboard load is one cache read in the common case and two small indexed
+queries on a miss.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Session
+
+UPCOMING_LIMIT = 3
+UPCOMING_CACHE_TTL = 300
+
+
+def upcoming_cache_key(user_id):
+    return f"exchanges:upcoming:{user_id}"
+
+
+def invalidate_upcoming(user_ids):
+    cache.delete_many([upcoming_cache_key(user_id) for user_id in set(user_ids)])
+
+
+def upcoming_sessions(user, limit=UPCOMING_LIMIT):
+    """The user's next pending/accepted sessions with a scheduled time, soonest first"""
+    key = upcoming_cache_key(user.pk)
+    sessions = cache.get(key)
+    if sessions is not None:
+        return sessions
+
+    now = timezone.now()
+    base = Session.objects.filter(
+        status__in=(Session.Status.PENDING, Session.Status.ACCEPTED),
+        scheduled_time__gte=now,
+    ).select_related('requester__profile', 'helper__profile').order_by('scheduled_time', 'id')
+    # One range read per side on (requester|helper, scheduled_time) instead of an OR
+    sessions = sorted(
+        list(base.filter(requester=user)[:limit]) + list(base.filter(helper=user)[:limit]),
+        key=lambda s: (s.scheduled_time, s.pk),
+    )[:limit]
+
+    # Don't serve a session from cache after it has started
+    timeout = UPCOMING_CACHE_TTL
+    if sessions:
+        timeout = max(1, min(timeout, int((sessions[0].scheduled_time - now).total_seconds())))
+    cache.set(key, sessions, timeout)
+    return sessions
@@ -0,0 +1,114 @@
+"""
+Cancel stale pending sessions and flag overdue accepted ones.
+
+    pending,  created more than --pending-days ago          -> cancelled
+    pending,  scheduled more than --pending-past-hours ago  -> cancelled
+    accepted, scheduled more than --accepted-days ago       -> flagged (expired_at set)
+
+Sessions with a SettlementJob are never touched.
+
+Open sessions are walked in primary-key order over a partial index, one
+--chunk-size range at a time. Each range is one short transaction: the stale
+rows in it are locked, cancelled with a single UPDATE and their participants'
+SessionCounters moved, so a session accepted meanwhile is left alone and no
+lock is held for longer than a chunk. Safe to run every few minutes.
+
+    python manage.py expire_sessions --dry-run
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from exchanges.models import Session, record_session_changes, sessions_changed
+
+EXPIRABLE = Q(status=Session.Status.PENDING) | Q(status=Session.Status.ACCEPTED, expired_at__isnull=True)
+
+
+class Command(BaseCommand):
+    help = 'Cancel stale pending sessions and flag long-overdue accepted ones in id-range chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pending-days', type=int, default=14,
+                            help='Cancel pending sessions created more than this many days ago')
+        parser.add_argument('--pending-past-hours', type=int, default=24,
+                            help='Cancel pending sessions whose scheduled time passed this many hours ago')
+        parser.add_argument('--accepted-days', type=int, default=7,
+                            help='Flag accepted sessions whose scheduled time passed this many days ago')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Open sessions per chunk')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would change without writing')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # A session with a settlement job has been completed by its requester,
+        # even if the job was queued before enqueue_settlement moved the status
+        unsettled = Q(settlement_job__isnull=True)
+        stale_pending = Q(status=Session.Status.PENDING) & unsettled & (
+            Q(created_at__lt=now - timedelta(days=options['pending_days']))
+            | Q(scheduled_time__lt=now - timedelta(hours=options['pending_past_hours']))
+        )
+        overdue_accepted = unsettled & Q(
+            status=Session.Status.ACCEPTED,
+            expired_at__isnull=True,
+            scheduled_time__lt=now - timedelta(days=options['accepted_days']),
+        )
+        chunk_size = max(1, options['chunk_size'])
+        dry_run = options['dry_run']
+
+        started = time.monotonic()
+        last_id = 0
+        chunks = scanned = cancelled = flagged = 0
+        slowest_ms = 0.0
+        while True:
+            ids = list(
+                Session.objects.filter(EXPIRABLE, id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            in_range = Q(id__gte=ids[0], id__lte=ids[-1])
+            chunk_started = time.monotonic()
+
+            if dry_run:
+                cancelled += Session.objects.filter(in_range & stale_pending).count()
+                flagged += Session.objects.filter(in_range & overdue_accepted).count()
+            else:
+                with transaction.atomic():
+                    # Lock the rows being cancelled so the counters move by exactly what changed
+                    rows = list(
+                        Session.objects.select_for_update().filter(in_range & stale_pending)
+                        .order_by('id').values_list('id', 'requester_id', 'helper_id')
+                    )
+                    if rows:
+                        cancelled += Session.objects.filter(id__in=[r[0] for r in rows]).update(
+                            status=Session.Status.CANCELLED, expired_at=now, updated_at=now
+                        )
+                        participants = [(requester_id, helper_id) for _, requester_id, helper_id in rows]
+                        record_session_changes(
+                            (requester_id, helper_id, Session.Status.PENDING, Session.Status.CANCELLED)
+                            for requester_id, helper_id in participants
+                        )
+                        sessions_changed(participants)
+                    flagged += Session.objects.filter(in_range & overdue_accepted).update(
+                        expired_at=now, updated_at=now
+                    )
+
+            slowest_ms = max(slowest_ms, (time.monotonic() - chunk_started) * 1000)
+            chunks += 1
+            scanned += len(ids)
+            last_id = ids[-1]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        prefix = '[dry run] ' if dry_run else ''
+        self.stdout.write(
+            f'{prefix}chunks={chunks} scanned={scanned} cancelled={cancelled} flagged={flagged} '
+            f'slowest_chunk_ms={slowest_ms:.1f} seconds={time.monotonic() - started:.2f}'
+        )
+        verb = 'Would expire' if dry_run else 'Expired'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {prefix}{verb} {cancelled} pending session(s), flagged {flagged} overdue accepted session(s)'
+        ))
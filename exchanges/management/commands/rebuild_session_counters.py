@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from exchanges.models import Session, SessionCounters
+
+User = get_user_model()
+
+COUNTER_FIELDS = [
+    f'{role}_{status}'
+    for role in ('requested', 'helping')
+    for status in SessionCounters.COUNTED_STATUSES
+]
+
+
+def count_sessions(lo, hi):
+    """``{user_id: {field: n}}`` for users ``lo <= id <= hi``, two grouped queries"""
+    counts = {}
+    for side, role in (('requester', 'requested'), ('helper', 'helping')):
+        rows = (
+            Session.objects.filter(**{f'{side}_id__gte': lo, f'{side}_id__lte': hi},
+                                   status__in=SessionCounters.COUNTED_STATUSES)
+            .values_list(f'{side}_id', 'status').annotate(n=Count('id')).order_by()
+        )
+        for user_id, status, n in rows:
+            counts.setdefault(user_id, {})[f'{role}_{status}'] = n
+    return counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute SessionCounters from Session in user-id chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users per chunk')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        last_id, rebuilt = 0, 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            lo, hi = user_ids[0], user_ids[-1]
+            now = timezone.now()
+            with transaction.atomic():
+                counts = count_sessions(lo, hi)
+                rows = [
+                    SessionCounters(
+                        user_id=user_id, updated_at=now,
+                        **{field: counts.get(user_id, {}).get(field, 0) for field in COUNTER_FIELDS}
+                    )
+                    for user_id in user_ids
+                ]
+                SessionCounters.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['user'],
+                    update_fields=COUNTER_FIELDS + ['updated_at'],
+                )
+            rebuilt += len(user_ids)
+            last_id = hi
+            self.stdout.write(f'  users {lo}-{hi}: {len(counts)} with sessions')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt session counters for {rebuilt} user(s)'))
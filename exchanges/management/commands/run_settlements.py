@@ -0,0 +1,40 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from exchanges.models import drain_settlement_jobs
+
+
+class Command(BaseCommand):
+    help = 'Settle queued session completions (run several copies to drain faster)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Jobs claimed per transaction')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on a job after this many tries')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                try:
+                    claimed = drain_settlement_jobs(
+                        batch_size=max(1, options['batch_size']),
+                        max_attempts=max(1, options['max_attempts']),
+                    )
+                except ValidationError as e:
+                    # Retries exhausted under heavy contention; back off and try again
+                    self.stderr.write(self.style.WARNING(f'  {e.messages[0]}'))
+                    time.sleep(options['sleep'])
+                    continue
+                total += claimed
+                if claimed:
+                    self.stdout.write(f'  processed {claimed} job(s)')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {total} settlement job(s)'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from exchanges.models import Session, settle_sessions
+
+
+class Command(BaseCommand):
+    help = 'Complete sessions and transfer their credits in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('session_ids', nargs='*', type=int, help='Session ids to settle')
+        parser.add_argument('--accepted-before', help='Also settle accepted sessions scheduled before this ISO datetime')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Sessions per transaction (bounds how long locks are held)')
+
+    def handle(self, *args, **options):
+        session_ids = list(options['session_ids'])
+
+        if options['accepted_before']:
+            cutoff = parse_datetime(options['accepted_before'])
+            if cutoff is None:
+                raise CommandError('--accepted-before must be an ISO datetime, e.g. 2025-12-19T18:00')
+            session_ids += Session.objects.filter(
+                status=Session.Status.ACCEPTED,
+                credits_transferred=False,
+                scheduled_time__lt=cutoff,
+            ).values_list('pk', flat=True)
+
+        session_ids = sorted(set(session_ids))
+        if not session_ids:
+            raise CommandError('No sessions to settle.')
+
+        settled, skipped = 0, {}
+        size = max(1, options['batch_size'])
+        for start in range(0, len(session_ids), size):
+            result = settle_sessions(session_ids[start:start + size])
+            settled += len(result['settled'])
+            skipped.update(result['skipped'])
+
+        for pk, reason in sorted(skipped.items()):
+            self.stdout.write(self.style.WARNING(f'  Skipped session #{pk}: {reason}'))
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Settled {settled} session(s), skipped {len(skipped)}')
+        )
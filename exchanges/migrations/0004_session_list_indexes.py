@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0003_settlement_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['requester', 'status', '-created_at', '-id'], name='exchanges_s_request_475e1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['helper', 'status', '-created_at', '-id'], name='exchanges_s_helper__917aee_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ends_at(apps, schema_editor):
+    from datetime import timedelta
+    Session = apps.get_model('exchanges', 'Session')
+    # One UPDATE per duration choice rather than a save() per row
+    for minutes in ('60', '90', '120'):
+        Session.objects.filter(duration=minutes, scheduled_time__isnull=False).update(
+            ends_at=models.F('scheduled_time') + timedelta(minutes=int(minutes))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0004_session_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_ends_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['helper', 'scheduled_time', 'ends_at'], name='exchanges_s_helper__0b5e1b_idx'),
+        ),
+        migrations.AddField(
+            model_name='availabilitywindow',
+            name='helper',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_windows', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='availabilitywindow',
+            index=models.Index(fields=['helper', 'end', 'start'], name='exchanges_a_helper__4359be_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='availabilitywindow',
+            constraint=models.CheckConstraint(condition=models.Q(('end__gt', models.F('start'))), name='availability_end_after_start'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0005_availability_windows'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['requester', 'scheduled_time'], name='exchanges_s_request_69a352_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0006_upcoming_sessions_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='expired_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(condition=models.Q(('status', 'pending'), models.Q(('expired_at__isnull', True), ('status', 'accepted')), _connector='OR'), fields=['id'], name='session_expirable_idx'),
+        ),
+    ]
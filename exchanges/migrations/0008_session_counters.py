@@ -0,0 +1,52 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Session = apps.get_model('exchanges', 'Session')
+    SessionCounters = apps.get_model('exchanges', 'SessionCounters')
+    counts = {}
+    for side, role in (('requester_id', 'requested'), ('helper_id', 'helping')):
+        rows = (
+            Session.objects.filter(status__in=('pending', 'accepted', 'completed'))
+            .values_list(side, 'status').annotate(n=Count('id')).order_by()
+        )
+        for user_id, status, n in rows:
+            counts.setdefault(user_id, {})[f'{role}_{status}'] = n
+    SessionCounters.objects.bulk_create(
+        [SessionCounters(user_id=user_id, **fields) for user_id, fields in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0007_session_expiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='session_counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('requested_pending', models.IntegerField(default=0)),
+                ('requested_accepted', models.IntegerField(default=0)),
+                ('requested_completed', models.IntegerField(default=0)),
+                ('helping_pending', models.IntegerField(default=0)),
+                ('helping_accepted', models.IntegerField(default=0)),
+                ('helping_completed', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Session counters',
+                'verbose_name_plural': 'Session counters',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
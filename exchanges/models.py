@@ -1,6 +1,10 @@
 from django.conf import settings
 from django.db import models, transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import timedelta
+from credits.concurrency import retry_on_conflict
 
 class Session(models.Model):
     class Status(models.TextChoices):
@@ -35,12 +39,33 @@ class Session(models.Model):
     
     # Scheduling
     scheduled_time = models.DateTimeField(null=True, blank=True, help_text="When the session is scheduled")
+    # scheduled_time + duration, kept in step by save() so overlap checks are one indexed range query
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
     credits_transferred = models.BooleanField(default=False)
+    # Set by expire_sessions: when a stale pending session was cancelled or an overdue accepted one flagged
+    expired_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Per-user session lists, filtered by status and paged newest first
+            models.Index(fields=["requester", "status", "-created_at", "-id"]),
+            models.Index(fields=["helper", "status", "-created_at", "-id"]),
+            # Booking overlap checks and free-slot search
+            models.Index(fields=["helper", "scheduled_time", "ends_at"]),
+            # Upcoming sessions on the requester's dashboard
+            models.Index(fields=["requester", "scheduled_time"]),
+            # Only sessions expire_sessions may still act on, so its scan skips settled history
+            models.Index(
+                fields=["id"],
+                condition=Q(status="pending") | Q(status="accepted", expired_at__isnull=True),
+                name="session_expirable_idx",
+            ),
+        ]
+    
     # Credit calculation table
     CREDIT_TABLE = {
         ('60', 'beginner'): 5,
@@ -58,10 +83,67 @@ class Session(models.Model):
         """Auto-calculate credits based on duration and level"""
         return self.CREDIT_TABLE.get((self.duration, self.level), 5)
     
+    # States each target status may be entered from
+    TRANSITIONS = {
+        Status.ACCEPTED: (Status.PENDING,),
+        Status.COMPLETED: (Status.ACCEPTED, Status.PENDING),
+        Status.CANCELLED: (Status.PENDING, Status.ACCEPTED),
+    }
+    
+    def compute_ends_at(self):
+        if self.scheduled_time is None:
+            return None
+        return self.scheduled_time + timedelta(minutes=int(self.duration))
+    
     def save(self, *args, **kwargs):
-        # Auto-calculate credits before saving
-        self.agreed_amount = self.calculate_credits()
-        super().save(*args, **kwargs)
+        # Auto-calculate credits before saving, unless this save cannot change them
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"duration", "level"} & set(update_fields):
+            self.agreed_amount = self.calculate_credits()
+            if update_fields is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]) | {"agreed_amount"}
+        if update_fields is None or {"duration", "scheduled_time"} & set(update_fields):
+            self.ends_at = self.compute_ends_at()
+            if update_fields is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]) | {"ends_at"}
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                record_session_changes([(self.requester_id, self.helper_id, None, self.status)])
+        elif update_fields is None or "status" in update_fields:
+            with transaction.atomic():
+                # Locked, so a concurrent transition() can't change it before we write
+                previous = Session.objects.select_for_update().filter(pk=self.pk).values_list("status", flat=True).first()
+                super().save(*args, **kwargs)
+                if previous not in (None, self.status):
+                    record_session_changes([(self.requester_id, self.helper_id, previous, self.status)])
+        else:
+            super().save(*args, **kwargs)
+        sessions_changed([(self.requester_id, self.helper_id)])
+    
+    @classmethod
+    def transition(cls, pk, to_status, **fields):
+        """Move session ``pk`` to ``to_status`` in one conditional UPDATE.
+        
+        Returns True if this caller made the change, False if the session was
+        not in one of the allowed source states (someone else got there first).
+        The participants' SessionCounters move in the same transaction.
+        """
+        # One conditional UPDATE per allowed source state, so the winner also
+        # learns which state it left and can move the per-user counters
+        for source in cls.TRANSITIONS[to_status]:
+            with transaction.atomic():
+                updated = cls.objects.filter(pk=pk, status=source).update(
+                    status=to_status, updated_at=timezone.now(), **fields
+                )
+                if updated:
+                    requester_id, helper_id = cls.objects.filter(pk=pk).values_list(
+                        "requester_id", "helper_id"
+                    ).get()
+                    record_session_changes([(requester_id, helper_id, source, to_status)])
+                    sessions_changed([(requester_id, helper_id)])
+                    return True
+        return False
 
     def clean(self):
         if self.requester_id == self.helper_id:
@@ -69,26 +151,325 @@ class Session(models.Model):
         if self.agreed_amount <= 0:
             raise ValidationError("Agreed amount must be positive.")
 
-    def mark_completed(self, by_user):
-        from credits.models import transfer_credits
+    @retry_on_conflict
+    def mark_completed(self, by_user, idempotency_key=None):
+        from credits.models import transfer_credits, find_idempotency_key, claim_idempotency_key
         if by_user != self.requester and not getattr(by_user, "is_staff", False):
             raise ValidationError("Only the requester (or staff) can mark a session completed.")
+        if idempotency_key:
+            # A repeated submission is answered from the key row, without any locks
+            prior = find_idempotency_key(by_user, "complete", idempotency_key)
+            if prior is not None:
+                if prior.session_id != self.pk:
+                    raise ValidationError("This request has already been used for another session.")
+                return prior.session
         with transaction.atomic():
-            sess = Session.objects.select_for_update().get(pk=self.pk)
-            if sess.status == Session.Status.COMPLETED:
-                return sess
-            if sess.status not in (Session.Status.ACCEPTED, Session.Status.PENDING):
+            if idempotency_key and claim_idempotency_key(by_user, "complete", idempotency_key, session=self) is None:
+                # Lost the race to a concurrent request with the same key
+                prior = find_idempotency_key(by_user, "complete", idempotency_key)
+                if prior.session_id != self.pk:
+                    raise ValidationError("This request has already been used for another session.")
+                return Session.objects.get(pk=self.pk)
+            # The conditional UPDATE both claims the session and flips the flag;
+            # a failed transfer below rolls it back.
+            if not Session.transition(self.pk, Session.Status.COMPLETED, credits_transferred=True):
+                sess = Session.objects.get(pk=self.pk)
+                if sess.status == Session.Status.COMPLETED:
+                    return sess
                 raise ValidationError(f"Cannot complete a session in status '{sess.status}'.")
-            sess.status = Session.Status.COMPLETED
-            sess.save(update_fields=["status", "updated_at"])
-            if not sess.credits_transferred:
-                transfer_credits(
-                    from_user=sess.requester, to_user=sess.helper,
-                    amount=sess.agreed_amount, note=f"Session #{sess.id}", session=sess
-                )
-                sess.credits_transferred = True
-                sess.save(update_fields=["credits_transferred", "updated_at"])
-        return sess
+            transfer_credits(
+                from_user=self.requester, to_user=self.helper,
+                amount=self.agreed_amount, note=f"Session #{self.pk}", session=self
+            )
+        self.status = Session.Status.COMPLETED
+        self.credits_transferred = True
+        return self
 
     def __str__(self):
         return f"Session #{self.pk} {self.requester} → {self.helper} ({self.status})"
+
+
+
+class SettlementJob(models.Model):
+    """A completed-by-requester session waiting for run_settlements to move its credits"""
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, related_name="settlement_job")
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="+")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not retried before this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at", "id"]),
+        ]
+
+    def __str__(self):
+        return f"Settlement of session #{self.session_id} ({self.status})"
+
+
+class SessionCounters(models.Model):
+    """Per-user session counts by role and status, for navbar and dashboard badges.
+
+    Moved in the same transaction as every status change (``Session.save``,
+    ``Session.transition``, batch settlement, expiry); ``rebuild_session_counters``
+    recomputes them from Session.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="session_counters"
+    )
+    requested_pending = models.IntegerField(default=0)
+    requested_accepted = models.IntegerField(default=0)
+    requested_completed = models.IntegerField(default=0)
+    helping_pending = models.IntegerField(default=0)
+    helping_accepted = models.IntegerField(default=0)
+    helping_completed = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTED_STATUSES = ("pending", "accepted", "completed")
+
+    class Meta:
+        verbose_name = "Session counters"
+        verbose_name_plural = "Session counters"
+
+    def __str__(self):
+        return f"SessionCounters({self.user_id})"
+
+    @classmethod
+    def for_user(cls, user):
+        """Counters row for ``user``, or an unsaved all-zero one"""
+        return cls.objects.filter(user=user).first() or cls(user=user)
+
+    @property
+    def active_total(self):
+        return self.requested_pending + self.requested_accepted + self.helping_pending + self.helping_accepted
+
+    @property
+    def completed_total(self):
+        return self.requested_completed + self.helping_completed
+
+
+def record_session_changes(changes):
+    """Apply ``(requester_id, helper_id, old_status, new_status)`` changes to SessionCounters.
+
+    ``old_status`` is None for a new session. Rows are created if missing and
+    updated with F() expressions in user-id order, one UPDATE per user.
+    """
+    counted = SessionCounters.COUNTED_STATUSES
+    deltas = {}
+    for requester_id, helper_id, old, new in changes:
+        for user_id, role in ((requester_id, "requested"), (helper_id, "helping")):
+            delta = deltas.setdefault(user_id, {})
+            if old in counted:
+                delta[f"{role}_{old}"] = delta.get(f"{role}_{old}", 0) - 1
+            if new in counted:
+                delta[f"{role}_{new}"] = delta.get(f"{role}_{new}", 0) + 1
+
+    deltas = {user_id: {f: n for f, n in d.items() if n} for user_id, d in deltas.items()}
+    deltas = {user_id: d for user_id, d in deltas.items() if d}
+    if not deltas:
+        return
+    SessionCounters.objects.bulk_create(
+        [SessionCounters(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+    )
+    now = timezone.now()
+    for user_id in sorted(deltas):
+        SessionCounters.objects.filter(user_id=user_id).update(
+            updated_at=now, **{f: models.F(f) + n for f, n in deltas[user_id].items()}
+        )
+
+
+def sessions_changed(participants):
+    """Drop cached per-user session views once the surrounding transaction commits.
+
+    ``participants`` is an iterable of ``(requester_id, helper_id)`` pairs.
+    """
+    from .dashboard import invalidate_upcoming
+
+    user_ids = {user_id for pair in participants for user_id in pair}
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_upcoming(user_ids))
+
+
+def settlement_async_enabled():
+    return getattr(settings, "SESSION_ASYNC_SETTLEMENT", False)
+
+
+def enqueue_settlement(session, by_user):
+    """Record that ``session`` should be completed; a worker transfers the credits later.
+
+    The session moves to COMPLETED (with ``credits_transferred`` still False)
+    in the same transaction, so it can no longer be cancelled or expired
+    while the job waits; ``settle_sessions`` pays such sessions out.
+    """
+    if by_user != session.requester and not getattr(by_user, "is_staff", False):
+        raise ValidationError("Only the requester (or staff) can mark a session completed.")
+    if session.credits_transferred:
+        raise ValidationError("This session has already been completed.")
+    if session.status not in (Session.Status.ACCEPTED, Session.Status.PENDING, Session.Status.COMPLETED):
+        raise ValidationError(f"Cannot complete a session in status '{session.status}'.")
+
+    with transaction.atomic():
+        job, created = SettlementJob.objects.get_or_create(
+            session=session, defaults={"requested_by": by_user}
+        )
+        if created:
+            if not Session.transition(session.pk, Session.Status.COMPLETED):
+                status = Session.objects.filter(pk=session.pk).values_list("status", flat=True).get()
+                raise ValidationError(f"Cannot complete a session in status '{status}'.")
+        elif job.status == SettlementJob.Status.FAILED:
+            job.status = SettlementJob.Status.QUEUED
+            job.attempts = 0
+            job.available_at = timezone.now()
+            job.save(update_fields=["status", "attempts", "available_at"])
+    session.status = Session.Status.COMPLETED
+    return job
+
+
+def pending_settlements(user):
+    """Queued jobs in which ``user`` pays or gets paid"""
+    return SettlementJob.objects.filter(
+        Q(session__requester=user) | Q(session__helper=user),
+        status=SettlementJob.Status.QUEUED,
+    ).select_related("session").order_by("id")
+
+@retry_on_conflict
+def settle_sessions(session_ids):
+    """Complete many sessions and move their credits in a single transaction.
+
+    Sessions are locked in id order, then every affected wallet in one
+    ordered pass. Each payer's balance is checked against the sessions
+    processed before it, so an unfunded session is skipped rather than
+    failing the whole batch. Returns ``{"settled": [ids], "skipped": {id: reason}}``.
+    """
+    from credits.models import (
+        CreditWallet, Transfer, available_balances, ledger_enabled, lock_wallets, post_transfers,
+    )
+
+    result = {"settled": [], "skipped": {}}
+    session_ids = sorted(set(int(pk) for pk in session_ids))
+    if not session_ids:
+        return result
+
+    with transaction.atomic():
+        sessions = list(
+            Session.objects.select_for_update().filter(pk__in=session_ids).order_by("pk")
+        )
+        for pk in set(session_ids) - {s.pk for s in sessions}:
+            result["skipped"][pk] = "not found"
+
+        due = []
+        for sess in sessions:
+            if sess.credits_transferred:
+                result["skipped"][sess.pk] = "already settled"
+            elif sess.status not in (Session.Status.ACCEPTED, Session.Status.PENDING, Session.Status.COMPLETED):
+                result["skipped"][sess.pk] = f"status '{sess.status}'"
+            else:
+                due.append(sess)
+        if not due:
+            return result
+
+        payer_ids = {s.requester_id for s in due}
+        payee_ids = {s.helper_id for s in due}
+        if ledger_enabled():
+            # Ledger mode only needs the payers serialised
+            wallets, _ = lock_wallets(*payer_ids)
+            for wallet in CreditWallet.objects.filter(user_id__in=payee_ids - payer_ids).only("id", "user_id"):
+                wallets[wallet.user_id] = wallet
+        else:
+            wallets, _ = lock_wallets(*(payer_ids | payee_ids))
+
+        balances = available_balances({uid: wallets[uid] for uid in payer_ids})
+        transfers = []
+        for sess in due:
+            if balances[sess.requester_id] < sess.agreed_amount:
+                result["skipped"][sess.pk] = "insufficient balance"
+                continue
+            balances[sess.requester_id] -= sess.agreed_amount
+            if sess.helper_id in balances:
+                balances[sess.helper_id] += sess.agreed_amount
+            transfers.append(Transfer(
+                sess.requester_id, sess.helper_id, sess.agreed_amount, f"Session #{sess.pk}", sess.pk
+            ))
+            result["settled"].append(sess.pk)
+
+        if transfers:
+            post_transfers(transfers, wallets)
+            Session.objects.filter(pk__in=result["settled"]).update(
+                status=Session.Status.COMPLETED, credits_transferred=True, updated_at=timezone.now()
+            )
+            settled = set(result["settled"])
+            record_session_changes(
+                (sess.requester_id, sess.helper_id, sess.status, Session.Status.COMPLETED)
+                for sess in due if sess.pk in settled
+            )
+            sessions_changed((t.from_user_id, t.to_user_id) for t in transfers)
+    return result
+
+
+@retry_on_conflict
+def drain_settlement_jobs(batch_size=50, max_attempts=5):
+    """Claim up to ``batch_size`` due jobs and settle them together; returns the number claimed.
+
+    ``SKIP LOCKED`` lets several workers drain the queue side by side, each
+    taking a different batch instead of waiting on the others' rows.
+    """
+    with transaction.atomic():
+        jobs = list(
+            SettlementJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SettlementJob.Status.QUEUED, available_at__lte=timezone.now())
+            .order_by("id")[:batch_size]
+        )
+        if not jobs:
+            return 0
+
+        result = settle_sessions([job.session_id for job in jobs])
+        settled = set(result["settled"])
+        now = timezone.now()
+        for job in jobs:
+            reason = result["skipped"].get(job.session_id)
+            job.attempts += 1
+            job.processed_at = now
+            if job.session_id in settled or reason == "already settled":
+                job.status = SettlementJob.Status.DONE
+                job.last_error = ""
+            else:
+                job.last_error = reason or "unknown"
+                if job.attempts >= max_attempts:
+                    job.status = SettlementJob.Status.FAILED
+                else:
+                    # Exponential backoff so an unfunded session does not hog every batch
+                    job.available_at = now + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+        SettlementJob.objects.bulk_update(
+            jobs, ["status", "attempts", "last_error", "available_at", "processed_at"]
+        )
+    return len(jobs)
+
+
+class AvailabilityWindow(models.Model):
+    """A span of time in which a helper accepts bookings"""
+    helper = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="availability_windows"
+    )
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start"]
+        indexes = [
+            models.Index(fields=["helper", "end", "start"]),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(end__gt=models.F("start")), name="availability_end_after_start"),
+        ]
+
+    def __str__(self):
+        return f"{self.helper} available {self.start:%Y-%m-%d %H:%M} - {self.end:%H:%M}"
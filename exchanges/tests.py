@@ -1,3 +1,318 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from credits import models as credit_models
+from credits.models import CreditTransaction, CreditWallet
+
+from .availability import check_booking, free_slots
+from .models import (
+    AvailabilityWindow, Session, SessionCounters, SettlementJob, drain_settlement_jobs, enqueue_settlement, settle_sessions,
+)
+
+User = get_user_model()
+
+
+def make_user(email):
+    """A verified user with a completed profile, so views are not redirected to setup"""
+    user = User.objects.create_user(email, "pw", email_verified=True)
+    user.profile.is_completed = True
+    user.profile.handle = email.split("@")[0]
+    user.profile.save()
+    return user
+
+
+class SessionTestMixin:
+    def setUp(self):
+        self.requester = make_user("requester@example.com")
+        self.helper = make_user("helper@example.com")
+        CreditWallet.objects.filter(user__in=[self.requester, self.helper]).update(balance=20)
+
+    def make_session(self, **fields):
+        fields.setdefault("status", Session.Status.ACCEPTED)
+        return Session.objects.create(requester=self.requester, helper=self.helper, title="Calculus", **fields)
+
+    def balance(self, user):
+        return CreditWallet.objects.get(user=user).current_balance
+
+
+class TransitionTests(SessionTestMixin, TestCase):
+    def test_second_transition_is_rejected(self):
+        session = self.make_session(status=Session.Status.PENDING)
+
+        self.assertTrue(Session.transition(session.pk, Session.Status.ACCEPTED))
+        self.assertFalse(Session.transition(session.pk, Session.Status.ACCEPTED))
+
+        counters = SessionCounters.objects.get(user=self.helper)
+        self.assertEqual((counters.helping_pending, counters.helping_accepted), (0, 1))
+
+    def test_save_over_a_concurrent_transition_keeps_counters_in_step(self):
+        session = self.make_session(status=Session.Status.PENDING)
+        stale = Session.objects.get(pk=session.pk)
+        Session.transition(session.pk, Session.Status.ACCEPTED)
+
+        stale.status = Session.Status.CANCELLED
+        stale.save()
+
+        counters = SessionCounters.objects.get(user=self.helper)
+        self.assertEqual((counters.helping_pending, counters.helping_accepted), (0, 0))
+
+    def test_transition_from_a_disallowed_state_is_rejected(self):
+        session = self.make_session(status=Session.Status.CANCELLED)
+
+        self.assertFalse(Session.transition(session.pk, Session.Status.COMPLETED))
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.CANCELLED)
+
+
+class MarkCompletedTests(SessionTestMixin, TestCase):
+    def test_pays_the_helper_once(self):
+        session = self.make_session()
+
+        session.mark_completed(self.requester)
+        Session.objects.get(pk=session.pk).mark_completed(self.requester)
+
+        self.assertEqual(CreditTransaction.objects.filter(session=session).count(), 1)
+        self.assertEqual(self.balance(self.requester), 20 - session.agreed_amount)
+        self.assertEqual(self.balance(self.helper), 20 + session.agreed_amount)
+
+    def test_repeated_idempotency_key_completes_once(self):
+        session = self.make_session()
+
+        session.mark_completed(self.requester, idempotency_key="done-1")
+        again = Session.objects.get(pk=session.pk).mark_completed(self.requester, idempotency_key="done-1")
+
+        self.assertEqual(again.pk, session.pk)
+        self.assertEqual(CreditTransaction.objects.filter(session=session).count(), 1)
+
+    def test_key_used_for_another_session_is_rejected(self):
+        first, second = self.make_session(), self.make_session()
+        first.mark_completed(self.requester, idempotency_key="done-1")
+
+        with self.assertRaisesMessage(ValidationError, "another session"):
+            second.mark_completed(self.requester, idempotency_key="done-1")
+        second.refresh_from_db()
+        self.assertEqual(second.status, Session.Status.ACCEPTED)
+
+    def test_key_claimed_concurrently_for_another_session_is_rejected(self):
+        first, second = self.make_session(), self.make_session()
+        first.mark_completed(self.requester, idempotency_key="done-1")
+        # As if the other request committed between the lookup and the claim
+        lookups = [None, credit_models.find_idempotency_key(self.requester, "complete", "done-1")]
+
+        with mock.patch.object(credit_models, "find_idempotency_key", side_effect=lookups):
+            with self.assertRaisesMessage(ValidationError, "another session"):
+                second.mark_completed(self.requester, idempotency_key="done-1")
+        second.refresh_from_db()
+        self.assertEqual(second.status, Session.Status.ACCEPTED)
+
+    def test_complete_view_only_accepts_post(self):
+        session = self.make_session()
+        self.client.force_login(self.requester)
+
+        response = self.client.get(reverse("exchanges:complete", args=[session.pk]))
+
+        self.assertEqual(response.status_code, 405)
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.ACCEPTED)
+
+    def test_only_the_requester_can_complete(self):
+        session = self.make_session()
+
+        with self.assertRaises(ValidationError):
+            session.mark_completed(self.helper)
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.ACCEPTED)
+
+    def test_unfunded_completion_rolls_back(self):
+        session = self.make_session(duration=Session.Duration.TWOHOURS, level=Session.Level.ADVANCED)
+        CreditWallet.objects.filter(user=self.requester).update(balance=1)
+
+        with self.assertRaisesMessage(ValidationError, "Insufficient balance."):
+            session.mark_completed(self.requester)
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.ACCEPTED)
+        self.assertFalse(session.credits_transferred)
+
+
+class SettlementTests(SessionTestMixin, TestCase):
+    def test_settle_sessions_skips_unfunded_and_settled(self):
+        first = self.make_session()
+        second = self.make_session(duration=Session.Duration.TWOHOURS, level=Session.Level.ADVANCED)
+        CreditWallet.objects.filter(user=self.requester).update(balance=first.agreed_amount)
+
+        result = settle_sessions([first.pk, second.pk])
+        again = settle_sessions([first.pk])
+
+        self.assertEqual(result["settled"], [first.pk])
+        self.assertEqual(result["skipped"], {second.pk: "insufficient balance"})
+        self.assertEqual(again["skipped"], {first.pk: "already settled"})
+        self.assertEqual(self.balance(self.requester), 0)
+
+    def test_job_drains_exactly_once(self):
+        session = self.make_session()
+        enqueue_settlement(session, self.requester)
+
+        self.assertEqual(drain_settlement_jobs(), 1)
+        self.assertEqual(drain_settlement_jobs(), 0)
+
+        job = SettlementJob.objects.get(session=session)
+        self.assertEqual((job.status, job.attempts), (SettlementJob.Status.DONE, 1))
+        self.assertEqual(CreditTransaction.objects.filter(session=session).count(), 1)
+        self.assertEqual(self.balance(self.helper), 20 + session.agreed_amount)
+
+    def test_enqueued_session_cannot_be_cancelled(self):
+        session = self.make_session()
+        enqueue_settlement(session, self.requester)
+        self.client.force_login(self.helper)
+
+        self.client.get(reverse("exchanges:cancel", args=[session.pk]))
+        session.refresh_from_db()
+        self.assertEqual((session.status, session.credits_transferred), (Session.Status.COMPLETED, False))
+
+        drain_settlement_jobs()
+        session.refresh_from_db()
+        self.assertTrue(session.credits_transferred)
+        self.assertEqual(self.balance(self.helper), 20 + session.agreed_amount)
+        counters = SessionCounters.objects.get(user=self.helper)
+        self.assertEqual((counters.helping_accepted, counters.helping_completed), (0, 1))
+
+    def test_enqueue_rejects_a_cancelled_session(self):
+        session = self.make_session()
+        Session.transition(session.pk, Session.Status.CANCELLED)
+
+        with self.assertRaises(ValidationError):
+            enqueue_settlement(session, self.requester)
+        self.assertFalse(SettlementJob.objects.exists())
+
+    def test_unfunded_job_backs_off_then_fails(self):
+        session = self.make_session()
+        CreditWallet.objects.filter(user=self.requester).update(balance=0)
+        enqueue_settlement(session, self.requester)
+
+        drain_settlement_jobs(max_attempts=2)
+        job = SettlementJob.objects.get(session=session)
+        self.assertEqual(job.status, SettlementJob.Status.QUEUED)
+        self.assertGreater(job.available_at, job.processed_at)
+
+        SettlementJob.objects.filter(pk=job.pk).update(available_at=job.processed_at)
+        drain_settlement_jobs(max_attempts=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), (SettlementJob.Status.FAILED, "insufficient balance"))
+        self.assertFalse(CreditTransaction.objects.exists())
+
+    def test_failed_job_can_be_requeued(self):
+        session = self.make_session()
+        job = SettlementJob.objects.create(
+            session=session, requested_by=self.requester, status=SettlementJob.Status.FAILED, attempts=5
+        )
+
+        enqueue_settlement(session, self.requester)
+        job.refresh_from_db()
+
+        self.assertEqual((job.status, job.attempts), (SettlementJob.Status.QUEUED, 0))
+
+
+class SessionDetailTests(SessionTestMixin, TestCase):
+    def detail(self, session, user):
+        self.client.force_login(user)
+        return self.client.get(reverse("exchanges:detail", args=[session.pk]))
+
+    def test_failed_settlement_offers_a_retry(self):
+        session = self.make_session()
+        SettlementJob.objects.create(
+            session=session, requested_by=self.requester, status=SettlementJob.Status.FAILED,
+            attempts=5, last_error="insufficient balance",
+        )
+
+        response = self.detail(session, self.requester)
+
+        self.assertContains(response, "Credit transfer failed")
+        self.assertContains(response, "Retry Credit Transfer")
+        self.assertNotContains(response, "will be transferred shortly")
+
+    def test_queued_settlement_hides_the_button(self):
+        session = self.make_session()
+        enqueue_settlement(session, self.requester)
+
+        response = self.detail(session, self.requester)
+
+        self.assertContains(response, "will be transferred shortly")
+        self.assertNotContains(response, reverse("exchanges:complete", args=[session.pk]))
+
+    def test_retry_requeues_a_failed_job(self):
+        session = self.make_session()
+        job = SettlementJob.objects.create(
+            session=session, requested_by=self.requester, status=SettlementJob.Status.FAILED, attempts=5
+        )
+        self.client.force_login(self.requester)
+
+        self.client.post(reverse("exchanges:complete", args=[session.pk]))
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, SettlementJob.Status.QUEUED)
+        self.assertFalse(CreditTransaction.objects.exists())
+
+
+class AvailabilityTests(SessionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = (timezone.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def test_helper_without_windows_is_free_and_bookable(self):
+        slots = free_slots(self.helper, Session.Duration.SIXTY, count=2, after=self.start)
+
+        self.assertEqual(slots[0], (self.start, self.start + timedelta(hours=1)))
+        check_booking(Session(requester=self.requester, helper=self.helper, scheduled_time=slots[1][0]))
+
+    def test_slots_stay_inside_published_windows(self):
+        AvailabilityWindow.objects.create(helper=self.helper, start=self.start, end=self.start + timedelta(hours=2))
+        self.make_session(scheduled_time=self.start)
+
+        slots = free_slots(self.helper, Session.Duration.SIXTY, after=self.start)
+
+        self.assertEqual(slots, [(self.start + timedelta(hours=1), self.start + timedelta(hours=2))])
+        outside = Session(requester=self.requester, helper=self.helper, scheduled_time=self.start + timedelta(hours=3))
+        with self.assertRaisesMessage(ValidationError, "outside the helper's availability"):
+            check_booking(outside)
+
+    def test_deleting_a_window_with_a_bad_id_does_not_fail(self):
+        window = AvailabilityWindow.objects.create(helper=self.helper, start=self.start, end=self.start + timedelta(hours=2))
+        self.client.force_login(self.helper)
+
+        response = self.client.post(reverse("exchanges:availability"), {"action": "delete", "window_id": "abc"})
+
+        self.assertRedirects(response, reverse("exchanges:availability"))
+        self.assertTrue(AvailabilityWindow.objects.filter(pk=window.pk).exists())
+
+
+class ExpireSessionsTests(SessionTestMixin, TestCase):
+    def expire(self):
+        call_command("expire_sessions", stdout=StringIO())
+
+    def test_cancels_stale_pending_sessions(self):
+        session = self.make_session(status=Session.Status.PENDING)
+        Session.objects.filter(pk=session.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        self.expire()
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.CANCELLED)
+        self.assertEqual(SessionCounters.objects.get(user=self.helper).helping_pending, 0)
+
+    def test_leaves_sessions_with_a_queued_settlement(self):
+        session = self.make_session(status=Session.Status.PENDING)
+        Session.objects.filter(pk=session.pk).update(created_at=timezone.now() - timedelta(days=30))
+        SettlementJob.objects.create(session=session, requested_by=self.requester)
+
+        self.expire()
 
-# Create your tests here.
+        session.refresh_from_db()
+        self.assertEqual(session.status, Session.Status.PENDING)
@@ -13,4 +13,8 @@ urlpatterns = [
     path("<int:pk>/accept/", views.accept_session_view, name="accept"),
     path("<int:pk>/complete/", views.complete_session_view, name="complete"),
     path("<int:pk>/cancel/", views.cancel_session_view, name="cancel"),
+    
+    # Availability
+    path("availability/", views.availability_view, name="availability"),
+    path("helpers/<int:user_id>/free-slots/", views.free_slots_view, name="free_slots"),
 ]
@@ -1,30 +1,67 @@
+import uuid
+
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db.models import Q
-from .models import Session
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST
+from core.pagination import paginate_keyset_merged
+from skills.suggestions import suggest_helpers
+from .availability import add_window, book_session, free_slots
+from .models import AvailabilityWindow, Session, SettlementJob, enqueue_settlement, settlement_async_enabled
 
 User = get_user_model()
 
 
+SESSION_PAGE_SIZE = 20
+
+# Status tab -> statuses it shows
+SESSION_TABS = {
+    'active': (Session.Status.PENDING, Session.Status.ACCEPTED),
+    'completed': (Session.Status.COMPLETED,),
+    'cancelled': (Session.Status.CANCELLED,),
+    'all': tuple(Session.Status.values),
+}
+SESSION_ROLES = ('all', 'requested', 'helping')
+
+
 @login_required
 def session_list_view(request):
-    """List all sessions for the logged-in user"""
-    # Sessions where user is requester
-    requested = Session.objects.filter(
-        requester=request.user
-    ).select_related('helper', 'helper__profile').order_by('-created_at')
-    
-    # Sessions where user is helper
-    helping = Session.objects.filter(
-        helper=request.user
-    ).select_related('requester', 'requester__profile').order_by('-created_at')
-    
+    """One page of the user's sessions, filtered by status tab and role"""
+    tab = request.GET.get('tab', 'active')
+    if tab not in SESSION_TABS:
+        tab = 'active'
+    role = request.GET.get('role', 'all')
+    if role not in SESSION_ROLES:
+        role = 'all'
+
+    sides = []
+    if role in ('all', 'requested'):
+        sides.append('requester')
+    if role in ('all', 'helping'):
+        sides.append('helper')
+
+    # One branch per (side, status) so each reads a single range of its composite index
+    base = Session.objects.select_related('requester__profile', 'helper__profile')
+    branches = [
+        base.filter(**{side: request.user, 'status': status})
+        for side in sides for status in SESSION_TABS[tab]
+    ]
+    page = paginate_keyset_merged(branches, request.GET.get('cursor'), SESSION_PAGE_SIZE)
+    for session in page:
+        session.role = 'requested' if session.requester_id == request.user.id else 'helping'
+
     return render(request, 'exchanges/session_list.html', {
-        'requested_sessions': requested,
-        'helping_sessions': helping,
+        'sessions': page,
+        'tab': tab,
+        'role': role,
+        'tabs': SESSION_TABS,
+        'next_cursor': page.next_cursor,
     })
 
 
@@ -44,6 +81,8 @@ def session_detail_view(request, pk):
     
     return render(request, 'exchanges/session_detail.html', {
         'session': session,
+        'settlement': SettlementJob.objects.filter(session=session).first(),
+        'idempotency_key': uuid.uuid4().hex,
     })
 
 
@@ -57,36 +96,35 @@ def create_session_view(request):
         duration = request.POST.get('duration', '60')
         level = request.POST.get('level', 'beginner')
         scheduled_time = request.POST.get('scheduled_time', '').strip()
+        if duration not in Session.Duration.values:
+            duration = Session.Duration.SIXTY
         
-        # Validation
-        if not helper_email or not title:
-            messages.error(request, "Please provide helper email and title.")
+        def render_form():
+            # Re-show the form with what was entered
             return render(request, 'exchanges/create_session.html', {
-                'suggested_helpers': User.objects.exclude(id=request.user.id).filter(email_verified=True)[:10],
+                'suggested_helpers': suggest_helpers(request.user),
                 'helper_email': helper_email,
                 'title': title,
+                'pre_filled_title': title,
                 'description': description,
                 'duration': duration,
                 'level': level,
                 'scheduled_time': scheduled_time,
             })
         
+        # Validation
+        if not helper_email or not title:
+            messages.error(request, "Please provide helper email and title.")
+            return render_form()
+        
         try:
             # Find helper
-            helper = User.objects.get(email__iexact=helper_email)
+            helper = User.objects.get_by_email(helper_email)
             
             # Check if not trying to help themselves
             if helper == request.user:
                 messages.error(request, "You cannot create a session with yourself.")
-                return render(request, 'exchanges/create_session.html', {
-                    'suggested_helpers': User.objects.exclude(id=request.user.id).filter(email_verified=True)[:10],
-                    'helper_email': helper_email,
-                    'title': title,
-                    'description': description,
-                    'duration': duration,
-                    'level': level,
-                    'scheduled_time': scheduled_time,
-                })
+                return render_form()
             
             # Create session (credits auto-calculated)
             session = Session(
@@ -104,42 +142,21 @@ def create_session_view(request):
                 from django.utils.dateparse import parse_datetime
                 parsed_time = parse_datetime(scheduled_time)
                 if parsed_time:
+                    if timezone.is_naive(parsed_time):
+                        parsed_time = timezone.make_aware(parsed_time)
                     session.scheduled_time = parsed_time
             
-            session.save()  # Credits auto-calculated in save()
+            book_session(session)  # Rejects double bookings; credits auto-calculated in save()
             
             messages.success(request, f"Session created successfully! {session.agreed_amount} credits will be transferred upon completion.")
             return redirect('exchanges:detail', pk=session.pk)
             
         except User.DoesNotExist:
             messages.error(request, f"User with email '{helper_email}' not found.")
-            return render(request, 'exchanges/create_session.html', {
-                'suggested_helpers': User.objects.exclude(id=request.user.id).filter(email_verified=True)[:10],
-                'helper_email': helper_email,
-                'title': title,
-                'description': description,
-                'duration': duration,
-                'level': level,
-                'scheduled_time': scheduled_time,
-            })
+            return render_form()
         except ValidationError as e:
-            messages.error(request, str(e))
-            return render(request, 'exchanges/create_session.html', {
-                'suggested_helpers': User.objects.exclude(id=request.user.id).filter(email_verified=True)[:10],
-                'helper_email': helper_email,
-                'title': title,
-                'description': description,
-                'duration': duration,
-                'level': level,
-                'scheduled_time': scheduled_time,
-            })
-    
-    # GET request - show form with suggested helpers
-    suggested_helpers = User.objects.exclude(
-        id=request.user.id
-    ).filter(
-        email_verified=True
-    ).select_related('profile')[:10]
+            messages.error(request, e.messages[0])
+            return render_form()
     
     # Pre-fill from query params
     helper_id = request.GET.get('helper', '')
@@ -157,14 +174,19 @@ def create_session_view(request):
             pass
     
     # Pre-fill title if skill_id provided
+    skill_names = []
     if skill_id:
         try:
             from skills.models import Skill
             skill = Skill.objects.get(id=skill_id)
             title = f"Learn {skill.name}"
+            skill_names.append(skill.name)
         except:
             pass
     
+    # Helpers ranked by how well their skills match what the user wants to learn
+    suggested_helpers = suggest_helpers(request.user, skill_names)
+    
     return render(request, 'exchanges/create_session.html', {
         'suggested_helpers': suggested_helpers,
         'helper_email': helper_email,
@@ -182,30 +204,39 @@ def accept_session_view(request, pk):
         messages.error(request, "Only the helper can accept this session.")
         return redirect('exchanges:detail', pk=pk)
     
-    if session.status != Session.Status.PENDING:
+    # Accept session only if it is still pending (race-free compare-and-set)
+    if not Session.transition(session.pk, Session.Status.ACCEPTED):
+        session.refresh_from_db(fields=['status'])
         messages.info(request, f"Session is already {session.get_status_display()}.")
         return redirect('exchanges:detail', pk=pk)
     
-    # Accept session
-    session.status = Session.Status.ACCEPTED
-    session.save(update_fields=['status', 'updated_at'])
-    
     messages.success(request, "Session accepted! You can now provide help.")
     return redirect('exchanges:detail', pk=pk)
 
 
 @login_required
+@require_POST
 def complete_session_view(request, pk):
     """Mark session as complete and transfer credits (requester only)"""
     session = get_object_or_404(Session, pk=pk)
+    idempotency_key = request.POST.get('idempotency_key', '').strip()[:64] or None
     
     try:
-        # This will check permissions and transfer credits
-        session.mark_completed(by_user=request.user)
-        messages.success(
-            request, 
-            f"Session completed! {session.agreed_amount} credits transferred to {session.helper.email}."
-        )
+        # A session that already has a (failed) job is retried through the queue
+        if settlement_async_enabled() or SettlementJob.objects.filter(session=session).exists():
+            # Record the completion and return at once; run_settlements moves the credits
+            enqueue_settlement(session, by_user=request.user)
+            messages.success(
+                request,
+                f"Session marked complete! {session.agreed_amount} credits will be transferred to {session.helper.email} shortly."
+            )
+        else:
+            # This will check permissions and transfer credits
+            session.mark_completed(by_user=request.user, idempotency_key=idempotency_key)
+            messages.success(
+                request, 
+                f"Session completed! {session.agreed_amount} credits transferred to {session.helper.email}."
+            )
     except ValidationError as e:
         messages.error(request, str(e))
     
@@ -222,17 +253,77 @@ def cancel_session_view(request, pk):
         messages.error(request, "You don't have permission to cancel this session.")
         return redirect('exchanges:detail', pk=pk)
     
-    if session.status == Session.Status.COMPLETED:
-        messages.error(request, "Cannot cancel a completed session.")
-        return redirect('exchanges:detail', pk=pk)
-    
-    if session.status == Session.Status.CANCELLED:
-        messages.info(request, "Session is already cancelled.")
+    # Cancel session only if it is still pending/accepted (race-free compare-and-set)
+    if not Session.transition(session.pk, Session.Status.CANCELLED):
+        session.refresh_from_db(fields=['status'])
+        if session.status == Session.Status.CANCELLED:
+            messages.info(request, "Session is already cancelled.")
+        else:
+            messages.error(request, f"Cannot cancel a {session.get_status_display().lower()} session.")
         return redirect('exchanges:detail', pk=pk)
     
-    # Cancel session
-    session.status = Session.Status.CANCELLED
-    session.save(update_fields=['status', 'updated_at'])
-    
     messages.success(request, "Session cancelled successfully.")
     return redirect('exchanges:detail', pk=pk)
+
+
+def _parse_local(value):
+    moment = parse_datetime(value or '')
+    if moment and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@login_required
+def availability_view(request):
+    """Publish and remove the logged-in user's availability windows"""
+    if request.method == 'POST':
+        if request.POST.get('action') == 'delete':
+            try:
+                window_id = int(request.POST.get('window_id', ''))
+            except ValueError:
+                messages.error(request, "Unknown availability window.")
+                return redirect('exchanges:availability')
+            AvailabilityWindow.objects.filter(pk=window_id, helper=request.user).delete()
+            messages.success(request, "Availability window removed.")
+            return redirect('exchanges:availability')
+
+        start = _parse_local(request.POST.get('start'))
+        end = _parse_local(request.POST.get('end'))
+        if not start or not end:
+            messages.error(request, "Please provide a valid start and end time.")
+        else:
+            try:
+                add_window(request.user, start, end)
+                messages.success(request, "Availability window added.")
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+        return redirect('exchanges:availability')
+
+    return render(request, 'exchanges/availability.html', {
+        'windows': AvailabilityWindow.objects.filter(helper=request.user, end__gt=timezone.now()),
+        'upcoming': Session.objects.filter(
+            helper=request.user,
+            status__in=(Session.Status.PENDING, Session.Status.ACCEPTED),
+            scheduled_time__gte=timezone.now(),
+        ).order_by('scheduled_time')[:20],
+    })
+
+
+@login_required
+def free_slots_view(request, user_id):
+    """JSON list of a helper's next free slots for a session of ``duration`` minutes"""
+    helper = get_object_or_404(User, pk=user_id)
+    duration = request.GET.get('duration', Session.Duration.SIXTY)
+    if duration not in Session.Duration.values:
+        duration = Session.Duration.SIXTY
+    try:
+        count = min(max(int(request.GET.get('count', 5)), 1), 50)
+    except ValueError:
+        count = 5
+
+    slots = free_slots(helper, duration, count=count, after=_parse_local(request.GET.get('after')))
+    return JsonResponse({
+        'helper': helper.pk,
+        'duration': int(duration),
+        'slots': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots],
+    })
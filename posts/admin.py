@@ -7,7 +7,7 @@ from .models import Post
 class PostAdmin(admin.ModelAdmin):
     """Post management"""
     list_display = ['title', 'user_email', 'kind_badge', 'is_active_badge', 'created_at']
-    list_filter = ['kind', 'is_active', 'created_at']
+    list_filter = ['kind', 'is_active', 'author_is_public', 'created_at']
     search_fields = ['title', 'description', 'user__email', 'skill_name']
     readonly_fields = ['user', 'created_at', 'updated_at', 'views']
     ordering = ['-created_at']
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.models import Post
+from skills.models import UserSkill
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized author visibility and department flags on posts and user skills'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users per chunk')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        last_id, users, changed = 0, 0, 0
+        while True:
+            chunk = list(
+                User.objects.filter(id__gt=last_id).order_by('id').only('id', 'is_staff', 'is_superuser')[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                for user in chunk:
+                    changed += Post.refresh_author_visibility(user)
+                    changed += Post.refresh_author_departments(user.pk)
+                    changed += UserSkill.refresh_author_visibility(user)
+            users += len(chunk)
+            last_id = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Checked {users} user(s), fixed {changed} row(s)'))
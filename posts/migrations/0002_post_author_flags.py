@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:58
+
+from django.conf import settings
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Q
+
+BATCH_SIZE = 500
+
+
+def backfill_author_flags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    UserSkill = apps.get_model('skills', 'UserSkill')
+    codes = [code for code, _ in UserSkill._meta.get_field('department').choices]
+    bits = {code: 1 << i for i, code in enumerate(codes)}
+
+    Post.objects.filter(Q(user__is_staff=True) | Q(user__is_superuser=True)).update(author_is_public=False)
+
+    masks = defaultdict(int)
+    for user_id, department in UserSkill.objects.values_list('user_id', 'department').distinct().iterator():
+        masks[user_id] |= bits.get(department, 0)
+    # One UPDATE per distinct mask and batch of authors, not one per post
+    users_by_mask = defaultdict(list)
+    for user_id, mask in masks.items():
+        users_by_mask[mask].append(user_id)
+    for mask, user_ids in users_by_mask.items():
+        for i in range(0, len(user_ids), BATCH_SIZE):
+            Post.objects.filter(user_id__in=user_ids[i:i + BATCH_SIZE]).update(author_departments=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+        ('skills', '0004_userskill_author_is_public'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='author_departments',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='author_is_public',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(backfill_author_flags, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author_is_public', '-created_at'], name='post_public_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author_is_public', 'is_active', '-created_at'], name='post_public_active_idx'),
+        ),
+    ]
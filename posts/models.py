@@ -1,5 +1,20 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from skills.models import UserSkill
+
+
+class PostQuerySet(models.QuerySet):
+    def public(self):
+        """Posts by non-staff authors"""
+        return self.filter(author_is_public=True)
+
+    def in_department(self, department):
+        """Posts whose author lists a skill in ``department``"""
+        bit = UserSkill.department_bit(department)
+        if not bit:
+            return self.none()
+        return self.alias(department_match=F('author_departments').bitand(bit)).filter(department_match=bit)
 
 
 class Post(models.Model):
@@ -18,11 +33,44 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     views = models.PositiveIntegerField(default=0)
+    # Denormalized from the author so search filters stay on this table:
+    # user.is_public_author, and the departments of the author's skills as
+    # bits (UserSkill.department_bit). Kept in step by posts.signals.
+    author_is_public = models.BooleanField(default=True, editable=False)
+    author_departments = models.BigIntegerField(default=0, editable=False)
+    
+    objects = PostQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['author_is_public', '-created_at'], name='post_public_recent_idx'),
+            models.Index(fields=['author_is_public', 'is_active', '-created_at'], name='post_public_active_idx'),
+        ]
         verbose_name = "Post"
         verbose_name_plural = "Posts"
     
     def __str__(self):
         return f"{self.user.email} - {self.get_kind_display()}: {self.title}"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.author_is_public = self.user.is_public_author
+            self.author_departments = self.author_department_mask(self.user_id)
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def author_department_mask(user_id):
+        return UserSkill.department_mask(
+            UserSkill.objects.filter(user_id=user_id).values_list('department', flat=True).distinct()
+        )
+    
+    @classmethod
+    def refresh_author_departments(cls, user_id):
+        mask = cls.author_department_mask(user_id)
+        return cls.objects.filter(user_id=user_id).exclude(author_departments=mask).update(author_departments=mask)
+    
+    @classmethod
+    def refresh_author_visibility(cls, user):
+        flag = user.is_public_author
+        return cls.objects.filter(user=user).exclude(author_is_public=flag).update(author_is_public=flag)
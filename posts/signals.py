@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.models import PUBLIC_AUTHOR_FIELDS
+from skills.models import UserSkill
+from .models import Post
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+def refresh_author_departments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Post.refresh_author_departments(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_author_visibility(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and not PUBLIC_AUTHOR_FIELDS & set(update_fields)):
+        return
+    Post.refresh_author_visibility(instance)
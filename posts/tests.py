@@ -1,3 +1,160 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from skills.models import Skill, UserSkill
+
+from .models import Post
+from . import view_counter
+from .view_counter import CacheBuffer, ProcessBuffer, ViewCounter
+
+User = get_user_model()
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user("author@example.com", "pw")
+        self.posts = [
+            Post.objects.create(user=user, kind="offer", title=f"Post {i}", description="-", skill_name="Python")
+            for i in range(3)
+        ]
+
+    def views(self):
+        return [Post.objects.get(pk=post.pk).views for post in self.posts]
+
+    def test_flush_writes_buffered_hits(self):
+        for buffer in (ProcessBuffer(), CacheBuffer()):
+            counter = ViewCounter(buffer, flush_seconds=3600)
+            counter.record_view(self.posts[0].pk)
+            counter.record_view(self.posts[0].pk)
+            counter.record_view(self.posts[2].pk)
+
+            self.assertEqual(counter.flush(), 3)
+            self.assertEqual(counter.flush(), 0)
+        self.assertEqual(self.views(), [4, 0, 2])
+
+    def fail_after_first_update(self):
+        """A write_deltas that updates one post and then fails"""
+        def write_deltas(deltas):
+            Post.objects.filter(pk=next(iter(deltas))).update(views=F("views") + 1)
+            raise DatabaseError("connection lost")
+        return mock.patch.object(view_counter, "write_deltas", write_deltas)
+
+    def test_failed_flush_rolls_back_and_keeps_the_hits(self):
+        counter = ViewCounter(CacheBuffer(), flush_seconds=3600)
+        counter.record_view(self.posts[0].pk)
+        counter.record_view(self.posts[1].pk)
+
+        with self.fail_after_first_update(), self.assertRaises(DatabaseError):
+            counter.flush()
+        self.assertEqual(self.views(), [0, 0, 0])
+
+        self.assertEqual(counter.flush(), 2)
+        self.assertEqual(self.views(), [1, 1, 0])
+
+    @override_settings(POST_VIEW_BUFFER="cache")
+    def test_failed_command_puts_the_hits_back(self):
+        buffer = CacheBuffer()
+        buffer.add(self.posts[0].pk, 3)
+        buffer.add(self.posts[2].pk)
+
+        with mock.patch.object(view_counter.counter, "buffer", buffer):
+            with self.fail_after_first_update(), self.assertRaises(CommandError):
+                call_command("flush_post_views", stdout=StringIO())
+            self.assertEqual(self.views(), [0, 0, 0])
+
+            call_command("flush_post_views", stdout=StringIO())
+        self.assertEqual(self.views(), [3, 0, 1])
+
+    def test_overlapping_takes_hand_out_each_hit_once(self):
+        buffer = CacheBuffer()
+        post_ids = [post.pk for post in self.posts]
+        for _ in range(5):
+            buffer.add(post_ids[0])
+        buffer.add(post_ids[1])
+
+        # Hold each take between reading the counts and clearing them until
+        # the other take has read too (or half a second has passed)
+        barrier = threading.Barrier(2, timeout=0.5)
+        get_many = LocMemCache.get_many
+
+        def get_many_then_wait(self, keys, version=None):
+            values = get_many(self, keys, version=version)
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            return values
+
+        taken = []
+        with mock.patch.object(LocMemCache, "get_many", get_many_then_wait):
+            flushers = [threading.Thread(target=lambda: taken.append(buffer.take(post_ids))) for _ in range(2)]
+            for thread in flushers:
+                thread.start()
+            for thread in flushers:
+                thread.join()
+
+        self.assertEqual(sum(sum(batch.values()) for batch in taken), 6)
+        self.assertEqual(buffer.take(post_ids), {})
+
+
+class AuthorFlagsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user("author@example.com", "pw")
+        self.post = Post.objects.create(
+            user=self.author, kind="offer", title="Guitar lessons", description="-", skill_name="Guitar",
+        )
+        self.guitar = Skill.objects.create(name="Guitar")
+        self.piano = Skill.objects.create(name="Piano")
+
+    def flags(self):
+        return Post.objects.values_list("author_departments", "author_is_public").get(pk=self.post.pk)
+
+    def in_department(self, department):
+        return list(Post.objects.in_department(department).values_list("pk", flat=True))
+
+    def test_adding_changing_and_deleting_skills_updates_departments(self):
+        skill = UserSkill.objects.create(user=self.author, skill=self.guitar, department="fine_arts")
+        self.assertEqual(self.flags()[0], UserSkill.department_bit("fine_arts"))
+        self.assertEqual(self.in_department("fine_arts"), [self.post.pk])
+        self.assertEqual(self.in_department("physics"), [])
+
+        UserSkill.objects.create(user=self.author, skill=self.piano, department="education")
+        skill.department = "physics"
+        skill.save()
+        self.assertEqual(self.flags()[0], UserSkill.department_bit("physics") | UserSkill.department_bit("education"))
+        self.assertEqual(self.in_department("fine_arts"), [])
+        self.assertEqual(self.in_department("physics"), [self.post.pk])
+
+        UserSkill.objects.filter(user=self.author).delete()
+        self.assertEqual(self.flags()[0], 0)
+        self.assertEqual(self.in_department("physics"), [])
+
+    def test_unknown_department_matches_nothing(self):
+        UserSkill.objects.create(user=self.author, skill=self.guitar, department="fine_arts")
+
+        self.assertEqual(self.in_department("astrology"), [])
+
+    def test_toggling_staff_flips_visibility_on_posts_and_skills(self):
+        UserSkill.objects.create(user=self.author, skill=self.guitar)
+
+        self.author.is_staff = True
+        self.author.save()
+        self.assertFalse(self.flags()[1])
+        self.assertFalse(UserSkill.objects.get(user=self.author).author_is_public)
+        self.assertEqual(list(Post.objects.public()), [])
+
+        self.author.is_staff = False
+        self.author.save()
+        self.assertTrue(self.flags()[1])
+        self.assertTrue(UserSkill.objects.get(user=self.author).author_is_public)
+        self.assertEqual(list(Post.objects.public()), [self.post])
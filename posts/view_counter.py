@@ -0,0 +1,182 @@
+"""
+Buffered post view counting.
+
+``record_view`` only bumps an in-memory or cache counter; the hits are written
+later as ``UPDATE ... SET views = views + delta``, one statement per distinct
+delta (posts viewed the same number of times share it). A process flushes
+the posts it saw once POST_VIEW_FLUSH_SECONDS have passed or
+FLUSH_THRESHOLD hits are pending, and again at exit.
+
+Where pending hits live is set by POST_VIEW_BUFFER:
+
+- ``process``: a Counter per worker. No shared state, but a worker that dies
+  without running its exit hook loses its last few seconds of hits.
+- ``cache``: the default cache (Redis in production). Counts survive a worker
+  crash and ``flush_post_views`` can write out everything pending. Taking the
+  counts is one atomic GETDEL per key, so overlapping flushes from several
+  workers never write the same hits twice.
+
+Flushes only happen on a view or at exit, so a worker that stops getting
+views holds its last hits until one of those. With the cache buffer, run
+``flush_post_views`` every minute or so to bound that lag; with the process
+buffer nothing else can reach them.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+FLUSH_THRESHOLD = 500
+
+
+class ProcessBuffer:
+    """Pending hits in this process's memory"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, post_id, count=1):
+        with self._lock:
+            self._counts[post_id] += count
+
+    def take(self, post_ids):
+        with self._lock:
+            taken = {pk: self._counts.pop(pk) for pk in post_ids if pk in self._counts}
+        return taken
+
+
+class CacheBuffer:
+    """Pending hits in the shared cache, one integer key per post"""
+
+    def __init__(self):
+        # Serialises add/take on backends without an atomic read-and-delete,
+        # which is enough for the per-process local-memory cache
+        self._lock = threading.Lock()
+
+    def key(self, post_id):
+        return f"posts:views:pending:{post_id}"
+
+    def add(self, post_id, count=1):
+        key = self.key(post_id)
+        with self._lock:
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, None):
+                    cache.incr(key, count)
+
+    def take(self, post_ids):
+        keys = {self.key(pk): pk for pk in post_ids}
+        backend = caches["default"]
+        if isinstance(backend, RedisCache):
+            counts = self._take_redis(backend, list(keys))
+        else:
+            with self._lock:
+                counts = cache.get_many(list(keys))
+                cache.delete_many(list(counts))
+        return {keys[key]: int(count) for key, count in counts.items() if count}
+
+    def _take_redis(self, backend, keys):
+        # GETDEL (Redis 6.2+) reads and clears each key in one step; hits that
+        # arrive afterwards start a fresh key instead of being taken twice
+        client = backend._cache.get_client(write=True)
+        pipe = client.pipeline()
+        for key in keys:
+            pipe.getdel(backend.make_and_validate_key(key))
+        return {key: count for key, count in zip(keys, pipe.execute()) if count is not None}
+
+
+def write_deltas(deltas):
+    """Add ``{post_id: hits}`` to Post.views, one UPDATE per distinct hit count"""
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        by_delta[delta].append(post_id)
+    for delta, post_ids in by_delta.items():
+        Post.objects.filter(pk__in=post_ids).update(views=F('views') + delta)
+    return sum(deltas.values())
+
+
+def write_or_restore(buffer, deltas):
+    """Write ``deltas`` taken from ``buffer`` in one transaction, putting them back if that fails"""
+    try:
+        with transaction.atomic():
+            return write_deltas(deltas)
+    except DatabaseError:
+        for post_id, count in deltas.items():
+            buffer.add(post_id, count)
+        raise
+
+
+class ViewCounter:
+    def __init__(self, buffer, flush_seconds):
+        self.buffer = buffer
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._touched = set()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def record_view(self, post_id):
+        self.buffer.add(post_id)
+        with self._lock:
+            self._touched.add(post_id)
+            self._pending += 1
+            due = (self._pending >= FLUSH_THRESHOLD
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            try:
+                self.flush()
+            except DatabaseError:
+                # Don't fail the page view; the hits stay buffered for next time
+                logger.warning("Could not flush buffered post views", exc_info=True)
+
+    def flush(self):
+        """Write out the hits this process recorded; returns how many"""
+        with self._lock:
+            touched, self._touched = self._touched, set()
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        if not touched:
+            return 0
+        deltas = self.buffer.take(touched)
+        try:
+            return write_or_restore(self.buffer, deltas)
+        except DatabaseError:
+            # The hits are back in the buffer; make sure the next flush retries them
+            with self._lock:
+                self._touched |= set(deltas)
+            raise
+
+
+BUFFERS = {
+    'process': ProcessBuffer,
+    'cache': CacheBuffer,
+}
+
+counter = ViewCounter(BUFFERS[settings.POST_VIEW_BUFFER](), settings.POST_VIEW_FLUSH_SECONDS)
+
+
+def record_view(post_id):
+    counter.record_view(post_id)
+
+
+def flush_at_exit():
+    try:
+        counter.flush()
+    except Exception:
+        logger.exception("Could not flush buffered post views at exit")
+
+
+atexit.register(flush_at_exit)
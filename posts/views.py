@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from core.pagination import estimated_count, paginate_keyset
+from search.cache import cached_results
+from search.engine import filter_matches
+from search.models import SearchDocument
 from .models import Post
+from .view_counter import record_view
 from .forms import PostForm
 
+POST_PAGE_SIZE = 20
+
 
 @login_required
 def post_list(request):
@@ -12,24 +18,29 @@ def post_list(request):
     query = request.GET.get('q', '').strip()
     kind_filter = request.GET.get('kind', '')
     
-    posts = Post.objects.filter(is_active=True).exclude(
-        Q(user__is_superuser=True) | Q(user__is_staff=True)
-    ).select_related('user', 'user__profile')
+    posts = Post.objects.public().filter(is_active=True).select_related('user', 'user__profile')
     
     if query:
-        posts = posts.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(skill_name__icontains=query)
-        )
+        posts = filter_matches(posts, SearchDocument.Kind.POST, query)
     
     if kind_filter in ['offer', 'want']:
         posts = posts.filter(kind=kind_filter)
     
+    cursor = request.GET.get('cursor', '')
+    
+    def browse():
+        page = paginate_keyset(posts, cursor, POST_PAGE_SIZE)
+        return page.items, page.next_cursor, estimated_count(posts)
+    
+    # Pages are cached per (query, kind, cursor) and dropped whenever posts change
+    items, next_cursor, total = cached_results('marketplace', query, kind_filter, cursor or 1, browse)
+    
     return render(request, 'posts/list.html', {
-        'posts': posts,
+        'posts': items,
         'query': query,
         'kind_filter': kind_filter,
+        'next_cursor': next_cursor,
+        'total': total,
     })
 
 
@@ -54,8 +65,8 @@ def post_create(request):
 def post_detail(request, pk):
     """View a single post"""
     post = get_object_or_404(Post, pk=pk)
-    post.views += 1
-    post.save(update_fields=['views'])
+    # Buffered and written in batches; see posts.view_counter
+    record_view(post.pk)
     
     return render(request, 'posts/detail.html', {'post': post})
 
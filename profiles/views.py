@@ -65,7 +65,11 @@ def public_profile_view(request, handle: str):
         return render(request, "profiles/public_profile.html", {"p": None})
 
     profile = get_object_or_404(Profile, handle__iexact=handle)
-    return render(request, "profiles/public_profile.html", {"profile": profile})
+    from credits.models import CreditStats
+    return render(request, "profiles/public_profile.html", {
+        "profile": profile,
+        "stats": CreditStats.for_user(profile.user),
+    })
 
 
 # --------- User search (required by exchange/urls.py) ---------
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import SearchDocument
+
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    """Indexed search text (maintained by signals, rebuilt by rebuild_search_index)"""
+    list_display = ['kind', 'object_id', 'title', 'is_public', 'updated_at']
+    list_filter = ['kind', 'is_public']
+    search_fields = ['title']
+    readonly_fields = ['kind', 'object_id', 'title', 'body', 'is_public', 'created_at', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,162 @@
+"""
+Full-text backends for SearchDocument.
+
+Each backend turns query term groups into SQL selecting matching
+``object_id``s, either unordered (to use as a subquery filter) or ranked by
+relevance. The ranked form takes an optional ``within`` subquery (SQL and
+params selecting allowed ids) so the caller's own filters apply before the
+LIMIT, not after it. Every group must match; a group matches if any one of its
+alternatives does, and an alternative is a tuple of words that must all
+match. Every word is matched as a prefix.
+
+- Postgres: generated ``search_vector`` tsvector (title weighted A, body B)
+  with a GIN index, queried with ``to_tsquery`` and ranked by ``ts_rank``.
+- SQLite: FTS5 external-content table ``search_searchdocument_fts`` kept in
+  sync by triggers, queried with ``MATCH`` and ranked by ``bm25``.
+- Anything else: ``LIKE`` over title/body (correct but unindexed).
+"""
+import re
+
+from django.db import connection
+
+TABLE = "search_searchdocument"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+
+def parse_terms(query):
+    """Lowercased word tokens of ``query``, at most MAX_TERMS"""
+    return [t.lower() for t in TOKEN_RE.findall(query or "")][:MAX_TERMS]
+
+
+def _join(groups, word, all_of, any_of):
+    """Render ``groups`` with ``word(w)`` and the AND/OR separators ``all_of``/``any_of``"""
+    def alternative(words):
+        text = all_of.join(word(w) for w in words)
+        return f"({text})" if len(words) > 1 else text
+
+    def group(alternatives):
+        text = any_of.join(alternative(a) for a in alternatives)
+        return f"({text})" if len(alternatives) > 1 else text
+
+    return all_of.join(group(g) for g in groups)
+
+
+def _within(alias, within):
+    """`` AND <alias>.object_id IN (<subquery>)`` and its params, or nothing"""
+    if within is None:
+        return "", []
+    sql, params = within
+    return f" AND {alias}.object_id IN ({sql})", list(params)
+
+
+class PostgresBackend:
+    install_sql = [
+        f"""ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(body, '')), 'B')
+            ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_vector_gin ON {TABLE} USING GIN (search_vector)",
+    ]
+    uninstall_sql = [
+        f"DROP INDEX IF EXISTS {TABLE}_vector_gin",
+        f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+    def _tsquery(self, groups):
+        # Words are \w+ only, so they carry no tsquery operators
+        return _join(groups, lambda w: f"{w}:*", " & ", " | ")
+
+    def match_sql(self, kind, groups):
+        return (
+            f"SELECT object_id FROM {TABLE} WHERE kind = %s AND is_public "
+            f"AND search_vector @@ to_tsquery('english', %s)",
+            [kind, self._tsquery(groups)],
+        )
+
+    def ranked_sql(self, kind, groups, limit, within=None):
+        clause, params = _within("d", within)
+        return (
+            f"SELECT d.object_id FROM {TABLE} d, to_tsquery('english', %s) q "
+            f"WHERE d.kind = %s AND d.is_public AND d.search_vector @@ q{clause} "
+            f"ORDER BY ts_rank(d.search_vector, q) DESC, d.created_at DESC LIMIT %s",
+            [self._tsquery(groups), kind, *params, limit],
+        )
+
+
+class SQLiteBackend:
+    fts = f"{TABLE}_fts"
+    install_sql = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                title, body, content='{TABLE}', content_rowid='id', tokenize='porter unicode61'
+            )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+                INSERT INTO {fts}(rowid, title, body) VALUES (new.id, new.title, new.body);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+                INSERT INTO {fts}(rowid, title, body) VALUES (new.id, new.title, new.body);
+            END""",
+        # Re-read the content table, for installs on top of existing rows
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+    uninstall_sql = [
+        f"DROP TRIGGER IF EXISTS {TABLE}_ai",
+        f"DROP TRIGGER IF EXISTS {TABLE}_ad",
+        f"DROP TRIGGER IF EXISTS {TABLE}_au",
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+    def _match(self, groups):
+        return _join(groups, lambda w: f'"{w}"*', " AND ", " OR ")
+
+    def match_sql(self, kind, groups):
+        return (
+            f"SELECT d.object_id FROM {self.fts} JOIN {TABLE} d ON d.id = {self.fts}.rowid "
+            f"WHERE {self.fts} MATCH %s AND d.kind = %s AND d.is_public",
+            [self._match(groups), kind],
+        )
+
+    def ranked_sql(self, kind, groups, limit, within=None):
+        # bm25 is lower-is-better; title matches weigh ten times body matches
+        clause, params = _within("d", within)
+        return (
+            f"SELECT d.object_id FROM {self.fts} JOIN {TABLE} d ON d.id = {self.fts}.rowid "
+            f"WHERE {self.fts} MATCH %s AND d.kind = %s AND d.is_public{clause} "
+            f"ORDER BY bm25({self.fts}, 10.0, 1.0), d.created_at DESC LIMIT %s",
+            [self._match(groups), kind, *params, limit],
+        )
+
+
+class LikeBackend:
+    install_sql = []
+    uninstall_sql = []
+
+    def _where(self, groups):
+        clause = _join(groups, lambda w: "(LOWER(title) LIKE %s OR LOWER(body) LIKE %s)", " AND ", " OR ")
+        words = [w for alternatives in groups for words in alternatives for w in words]
+        params = [p for w in words for p in (f"%{w}%", f"%{w}%")]
+        return clause, params
+
+    def match_sql(self, kind, groups):
+        clause, params = self._where(groups)
+        return f"SELECT object_id FROM {TABLE} WHERE kind = %s AND is_public AND {clause}", [kind] + params
+
+    def ranked_sql(self, kind, groups, limit, within=None):
+        sql, params = self.match_sql(kind, groups)
+        clause, within_params = _within(TABLE, within)
+        return f"{sql}{clause} ORDER BY created_at DESC LIMIT %s", params + within_params + [limit]
+
+
+BACKENDS = {
+    "postgresql": PostgresBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def get_backend(conn=None):
+    return BACKENDS.get((conn or connection).vendor, LikeBackend)()
@@ -0,0 +1,84 @@
+"""
+Cache of search results, keyed by the normalized (type, query, department, page)
+plus any further filters.
+
+Every key embeds a namespace version. Any write that can change a result
+(posts, user skills, profiles; see ``search.signals``) bumps the version, which
+makes every cached result unreachable at once without scanning for keys; the
+orphaned entries simply age out.
+
+    results = cached_results("posts", query, department, page, lambda: ranked(...))
+
+Hits and misses are counted in the same cache (``stats()``, and the
+``search_cache`` command).
+"""
+import hashlib
+import uuid
+
+from django.core.cache import caches
+
+ALIAS = "search"
+VERSION_KEY = "search:results:version"
+STATS_KEYS = {"hits": "search:results:hits", "misses": "search:results:misses"}
+
+
+def search_cache():
+    return caches[ALIAS]
+
+
+def normalize(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def current_version():
+    cache = search_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Invalidate every cached result"""
+    search_cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def result_key(version, search_type, query, department="", page=1, filters=()):
+    parts = "\x1f".join(normalize(p) for p in (search_type, query, department, page, *filters))
+    return f"search:results:{version}:{hashlib.sha1(parts.encode()).hexdigest()}"
+
+
+def _count(name):
+    cache, key = search_cache(), STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cached_results(search_type, query, department, page, compute, filters=()):
+    """``compute()``'s result for these parameters, from the cache when possible"""
+    cache = search_cache()
+    key = result_key(current_version(), search_type, query, department, page, filters)
+    results = cache.get(key)
+    if results is not None:
+        _count("hits")
+        return results
+    _count("misses")
+    results = compute()
+    cache.set(key, results)
+    return results
+
+
+def stats():
+    values = search_cache().get_many(list(STATS_KEYS.values()))
+    hits = values.get(STATS_KEYS["hits"], 0)
+    misses = values.get(STATS_KEYS["misses"], 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def reset_stats():
+    search_cache().delete_many(list(STATS_KEYS.values()))
@@ -0,0 +1,60 @@
+"""
+What text each searchable object contributes, and writing it to SearchDocument.
+"""
+from .models import SearchDocument
+
+Kind = SearchDocument.Kind
+
+
+def is_public_author(user):
+    return user.is_public_author
+
+
+def post_document(post):
+    return {
+        "title": f"{post.title} {post.skill_name}",
+        "body": post.description,
+        "is_public": post.is_active and is_public_author(post.user),
+        "created_at": post.created_at,
+    }
+
+
+def user_document(user):
+    profile = getattr(user, "profile", None)
+    names = [profile.display_name, profile.full_name, profile.handle or ""] if profile else []
+    return {
+        "title": " ".join(n for n in names if n),
+        "body": user.email,
+        "is_public": is_public_author(user),
+        "created_at": user.date_joined,
+    }
+
+
+def skill_document(user_skill):
+    return {
+        "title": user_skill.skill.name,
+        "body": f"{user_skill.description} {user_skill.get_department_display()}",
+        "is_public": is_public_author(user_skill.user),
+        "created_at": user_skill.created_at,
+    }
+
+
+BUILDERS = {
+    Kind.POST: post_document,
+    Kind.USER: user_document,
+    Kind.SKILL: skill_document,
+}
+
+
+def index_object(kind, obj):
+    SearchDocument.objects.update_or_create(kind=kind, object_id=obj.pk, defaults=BUILDERS[kind](obj))
+
+
+def remove_object(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def document_rows(kind, objects):
+    """Unsaved SearchDocuments for ``objects``, for bulk upserts"""
+    build = BUILDERS[kind]
+    return [SearchDocument(kind=kind, object_id=obj.pk, **build(obj)) for obj in objects]
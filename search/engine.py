@@ -0,0 +1,48 @@
+"""
+Query API used by the search page and the marketplace.
+
+    filter_matches(queryset, kind, query)  -> queryset restricted to matches
+    ranked(queryset, kind, query, limit)   -> list of objects, best match first
+
+Misspelled words are widened to their nearest known skill spellings first
+(see ``search.fuzzy.expand``), so "pyhton" also finds "python".
+"""
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .backends import get_backend, parse_terms
+from .fuzzy import expand
+
+
+def filter_matches(queryset, kind, query):
+    """``queryset`` narrowed to objects whose document matches every term of ``query``"""
+    terms = parse_terms(query)
+    if not terms:
+        return queryset.none()
+    sql, params = get_backend().match_sql(kind, expand(terms))
+    return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+def ranked_ids(kind, query, limit, queryset=None):
+    """Ids of the ``limit`` best matches, restricted to ``queryset`` inside the ranked query"""
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    within = None
+    if queryset is not None:
+        within = queryset.order_by().values("pk").query.sql_with_params()
+    sql, params = get_backend().ranked_sql(kind, expand(terms), limit, within)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ranked(queryset, kind, query, limit=20):
+    """Up to ``limit`` objects from ``queryset`` matching ``query``, most relevant first"""
+    ids = ranked_ids(kind, query, limit, queryset)
+    if not ids:
+        return []
+    position = {pk: i for i, pk in enumerate(ids)}
+    objects = list(queryset.filter(pk__in=ids))
+    objects.sort(key=lambda obj: position[obj.pk])
+    return objects
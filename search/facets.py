@@ -0,0 +1,165 @@
+"""
+Result counts per department, post kind and proficiency level for the search page.
+
+Each search type gets its counts from one query: a grouped aggregate over the
+matching rows (conditional counts per department bit for posts, GROUP BY
+department/level for skills, GROUP BY department for users). Counts for a query
+are cached with the search results (see ``search.cache``).
+
+Unfiltered totals, shown before anything is typed, are kept apart from the
+results version so that profile edits don't re-run the aggregates. Each count
+is its own counter in the search cache: creating or deleting a post or user
+skill adjusts the counters it contributes to, while edits and staff changes
+drop that type's counters to be recomputed on the next read (see
+``search.signals``). Counters expire after SEARCH_CACHE_TIMEOUT, which bounds
+the drift from writes that skip the signals.
+
+    facet_counts("posts", "python")
+    -> {"department": {"law": 2, ...}, "kind": {"offer": 5, "want": 1}}
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q
+from posts.models import Post
+from skills.models import UserSkill
+
+from .cache import cached_results, search_cache
+from .engine import filter_matches
+from .models import SearchDocument
+
+DEPARTMENT_CODES = [code for code, _ in UserSkill.DEPARTMENTS]
+POST_KINDS = [code for code, _ in Post.KIND_CHOICES]
+PROFICIENCY_LEVELS = [code for code, _ in UserSkill.PROFICIENCY_LEVELS]
+
+TOTALS_KEY = "search:facets:totals:{}:{}:{}"
+TOTALS_FACETS = {
+    "posts": {"department": DEPARTMENT_CODES, "kind": POST_KINDS},
+    "users": {"department": DEPARTMENT_CODES},
+    "skills": {"department": DEPARTMENT_CODES, "proficiency": PROFICIENCY_LEVELS},
+}
+
+
+def post_facets(posts):
+    """Department and kind counts over ``posts`` in one conditional aggregate"""
+    aliases = {
+        f"dept_{code}": F("author_departments").bitand(UserSkill.department_bit(code))
+        for code in DEPARTMENT_CODES
+    }
+    counts = posts.order_by().alias(**aliases).aggregate(
+        **{f"department:{code}": Count("pk", filter=Q(**{f"dept_{code}__gt": 0})) for code in DEPARTMENT_CODES},
+        **{f"kind:{kind}": Count("pk", filter=Q(kind=kind)) for kind in POST_KINDS},
+    )
+    facets = {"department": {}, "kind": {}}
+    for key, n in counts.items():
+        facet, value = key.split(":", 1)
+        facets[facet][value] = n
+    return facets
+
+
+def skill_facets(user_skills):
+    """Department and proficiency counts over ``user_skills``, one GROUP BY"""
+    facets = {
+        "department": dict.fromkeys(DEPARTMENT_CODES, 0),
+        "proficiency": dict.fromkeys(PROFICIENCY_LEVELS, 0),
+    }
+    rows = user_skills.order_by().values_list("department", "proficiency_level").annotate(n=Count("pk"))
+    for department, level, n in rows:
+        facets["department"][department] = facets["department"].get(department, 0) + n
+        facets["proficiency"][level] = facets["proficiency"].get(level, 0) + n
+    return facets
+
+
+def user_facets(users):
+    """How many of ``users`` list a skill in each department, one GROUP BY"""
+    facets = {"department": dict.fromkeys(DEPARTMENT_CODES, 0)}
+    rows = (
+        UserSkill.objects.filter(user__in=users.order_by().values("pk"))
+        .order_by().values_list("department").annotate(n=Count("user", distinct=True))
+    )
+    for department, n in rows:
+        facets["department"][department] = n
+    return facets
+
+
+def _sources():
+    User = get_user_model()
+    return {
+        "posts": (Post.objects.public().filter(is_active=True), SearchDocument.Kind.POST, post_facets),
+        "users": (User.objects.filter(is_staff=False, is_superuser=False), SearchDocument.Kind.USER, user_facets),
+        "skills": (UserSkill.objects.filter(author_is_public=True), SearchDocument.Kind.SKILL, skill_facets),
+    }
+
+
+def facet_counts(search_type, query=""):
+    """Facet counts for ``search_type`` results matching ``query``, or totals if it's empty"""
+    sources = _sources()
+    if search_type not in sources:
+        return {}
+    queryset, kind, count = sources[search_type]
+    if not query.strip():
+        return facet_totals(search_type)
+    return cached_results(
+        f"facets:{search_type}", query, "", 1,
+        lambda: count(filter_matches(queryset, kind, query)),
+    )
+
+
+def _totals_keys(search_type):
+    return {
+        TOTALS_KEY.format(search_type, facet, value): (facet, value)
+        for facet, values in TOTALS_FACETS[search_type].items()
+        for value in values
+    }
+
+
+def facet_totals(search_type):
+    cache, keys = search_cache(), _totals_keys(search_type)
+    counters = cache.get_many(list(keys))
+    if len(counters) == len(keys):
+        totals = {facet: {} for facet in TOTALS_FACETS[search_type]}
+        for key, (facet, value) in keys.items():
+            totals[facet][value] = counters[key]
+        return totals
+    queryset, _, count = _sources()[search_type]
+    totals = count(queryset)
+    cache.set_many(
+        {key: totals[facet].get(value, 0) for key, (facet, value) in keys.items()},
+        settings.SEARCH_CACHE_TIMEOUT,
+    )
+    return totals
+
+
+def adjust_totals(search_type, changes):
+    """Add ``changes`` ({(facet, value): delta}) to the cached totals of ``search_type``"""
+    cache, keys = search_cache(), _totals_keys(search_type)
+    for (facet, value), delta in changes.items():
+        key = TOTALS_KEY.format(search_type, facet, value)
+        if key not in keys:
+            continue
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Not cached: the next read recomputes every count for the type
+            pass
+
+
+def drop_totals(search_types):
+    search_cache().delete_many([key for search_type in search_types for key in _totals_keys(search_type)])
+
+
+def post_changes(post, sign=1):
+    """What ``post`` adds to the post totals, negated when ``sign`` is -1"""
+    if not (post.author_is_public and post.is_active):
+        return {}
+    changes = {("kind", post.kind): sign}
+    for code in DEPARTMENT_CODES:
+        if post.author_departments & UserSkill.department_bit(code):
+            changes[("department", code)] = sign
+    return changes
+
+
+def skill_changes(user_skill, sign=1):
+    """What ``user_skill`` adds to the skill totals, negated when ``sign`` is -1"""
+    if not user_skill.author_is_public:
+        return {}
+    return {("department", user_skill.department): sign, ("proficiency", user_skill.proficiency_level): sign}
@@ -0,0 +1,186 @@
+"""
+Typo-tolerant lookup of skill names (symmetric-delete, as in SymSpell).
+
+The vocabulary is every Skill name and distinct Post.skill_name, plus the
+words in them, weighted by how often they are used. For each term, every
+string obtainable by deleting up to MAX_DISTANCE characters from its first
+PREFIX_LENGTH characters is stored in a dict pointing back at the term. A
+lookup generates the same deletions of the input, collects the terms they
+point at and keeps those within the edit distance allowed for the input's
+length, so the cost depends on the input length, not on the vocabulary size.
+
+Multi-word names are also reachable by their initials ("ml" -> "Machine
+Learning").
+
+    lookup("pyhton")                  -> [Match("python", "Python", 1, ...)]
+    did_you_mean("calculas tutor")    -> "calculus tutor"
+    expand(["pyhton"])                -> [[("pyhton",), ("python",)]]
+"""
+from collections import namedtuple
+
+from django.db.models import Count
+
+from core.local_index import VersionedIndex
+
+from .backends import parse_terms
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+MIN_WORD_LENGTH = 3
+MAX_EXPANSIONS = 3
+VERSION_KEY = "search:fuzzy:version"
+# Post.skill_name changes are too frequent to bump on; other workers pick new
+# spellings up when their copy is rebuilt at this age
+MAX_AGE = 3600
+
+Match = namedtuple("Match", "term display distance count")
+Vocabulary = namedtuple("Vocabulary", "terms deletes acronyms")
+
+
+def normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+def allowed_distance(term):
+    """Short inputs get less slack, or "sql" would match half the vocabulary"""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 5:
+        return 1
+    return MAX_DISTANCE
+
+
+def deletions(term, distance):
+    """``term[:PREFIX_LENGTH]`` and everything reachable from it by up to ``distance`` deletions"""
+    found = {term[:PREFIX_LENGTH]}
+    edge = set(found)
+    for _ in range(distance):
+        edge = {w[:i] + w[i + 1:] for w in edge for i in range(len(w)) if len(w) > 1}
+        found |= edge
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count as one), or ``limit + 1`` if above"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        # A swap reaches back two rows, so give up only once both are past the limit
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def build_vocabulary():
+    from posts.models import Post
+    from skills.models import Skill
+
+    names = {}  # normalized name -> [display, count]
+    for name, used in Skill.objects.annotate(used=Count("user_skills")).values_list("name", "used"):
+        names[normalize(name)] = [name, used + 1]
+    for name, used in Post.objects.values("skill_name").annotate(used=Count("id")).values_list("skill_name", "used"):
+        key = normalize(name)
+        if not key:
+            continue
+        entry = names.setdefault(key, [name.strip(), 0])
+        entry[1] += used
+
+    terms = {}  # term -> (display, count)
+    acronyms = {}
+    for key, (display, count) in names.items():
+        terms[key] = (display, count)
+        words = key.split(" ")
+        if len(words) > 1:
+            for word in words:
+                if len(word) >= MIN_WORD_LENGTH and word.isalpha():
+                    _, seen = terms.get(word, (word, 0))
+                    terms[word] = (word, seen + count)
+            acronyms.setdefault("".join(w[0] for w in words), []).append((key, display, count))
+
+    deletes = {}
+    for term in terms:
+        for variant in deletions(term, MAX_DISTANCE):
+            deletes.setdefault(variant, []).append(term)
+    return Vocabulary(terms, deletes, acronyms)
+
+
+vocabulary = VersionedIndex(VERSION_KEY, build_vocabulary, max_age=MAX_AGE)
+
+
+def is_known(term):
+    return normalize(term) in vocabulary.get().terms
+
+
+def is_new_spelling(term):
+    """True if this process's built vocabulary lacks ``term``; False if unbuilt.
+
+    Cheap enough for save paths: it never builds the vocabulary.
+    """
+    vocab = vocabulary.peek()
+    return vocab is not None and normalize(term) not in vocab.terms
+
+
+def lookup(text, limit=5):
+    """Closest vocabulary terms to ``text``, nearest then most used first"""
+    term = normalize(text)
+    if not term:
+        return []
+    vocab = vocabulary.get()
+    limit_distance = allowed_distance(term)
+
+    matches = {}
+    for variant in deletions(term, limit_distance):
+        for candidate in vocab.deletes.get(variant, ()):
+            if candidate in matches:
+                continue
+            distance = edit_distance(term, candidate, limit_distance)
+            if distance <= limit_distance:
+                display, count = vocab.terms[candidate]
+                matches[candidate] = Match(candidate, display, distance, count)
+    for key, display, count in vocab.acronyms.get(term, ()):
+        matches.setdefault(key, Match(key, display, 1, count))
+
+    return sorted(matches.values(), key=lambda m: (m.distance, -m.count, m.term))[:limit]
+
+
+def correct(term):
+    """The best replacement for ``term``, or None if it's already known or nothing is close"""
+    if is_known(term):
+        return None
+    matches = lookup(term, limit=1)
+    return matches[0].term if matches else None
+
+
+def did_you_mean(query):
+    """``query`` with unknown words replaced by their nearest known term, or None"""
+    words = normalize(query).split(" ")
+    corrected = [correct(word) or word for word in words if word]
+    if not corrected or corrected == words:
+        return None
+    return " ".join(corrected)
+
+
+def expand(terms):
+    """Search term groups: each term plus, if unknown, its nearest known spellings.
+
+    Every group is a list of alternatives, and every alternative a tuple of
+    words that must all match; a term always keeps itself as the first one.
+    """
+    groups = []
+    for term in terms:
+        alternatives = [(term,)]
+        if len(term) >= 2 and not is_known(term):
+            for match in lookup(term, limit=MAX_EXPANSIONS):
+                alternative = tuple(parse_terms(match.term))
+                if alternative and alternative not in alternatives:
+                    alternatives.append(alternative)
+        groups.append(alternatives)
+    return groups
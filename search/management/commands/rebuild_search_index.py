@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from posts.models import Post
+from search import cache
+from search.backends import get_backend
+from search.documents import Kind, document_rows
+from search.models import SearchDocument
+from skills.models import UserSkill
+
+UPSERT_FIELDS = ['title', 'body', 'is_public', 'created_at', 'updated_at']
+
+
+def sources():
+    User = get_user_model()
+    return {
+        Kind.POST: Post.objects.select_related('user'),
+        Kind.USER: User.objects.select_related('profile'),
+        Kind.SKILL: UserSkill.objects.select_related('user', 'skill'),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents from posts, users and user skills in id-ordered chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Objects per chunk')
+        parser.add_argument('--kind', choices=Kind.values, help='Only rebuild this kind of document')
+        parser.add_argument('--install', action='store_true',
+                            help='(Re)create the full-text column/index or FTS table and triggers first')
+
+    def handle(self, *args, **options):
+        if options['install']:
+            with connection.cursor() as cursor:
+                for statement in get_backend().install_sql:
+                    cursor.execute(statement)
+            self.stdout.write(f'  installed {connection.vendor} full-text structures')
+
+        chunk_size = max(1, options['chunk_size'])
+        total = 0
+        for kind, queryset in sources().items():
+            if options['kind'] and kind != options['kind']:
+                continue
+            last_id, written = 0, 0
+            while True:
+                chunk = list(queryset.filter(pk__gt=last_id).order_by('pk')[:chunk_size])
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    SearchDocument.objects.bulk_create(
+                        document_rows(kind, chunk),
+                        update_conflicts=True,
+                        unique_fields=['kind', 'object_id'],
+                        update_fields=UPSERT_FIELDS,
+                    )
+                written += len(chunk)
+                last_id = chunk[-1].pk
+
+            # Documents whose object is gone (deleted without signals, e.g. raw SQL)
+            stale, _ = SearchDocument.objects.filter(kind=kind).exclude(
+                object_id__in=queryset.model.objects.values('pk')
+            ).delete()
+            self.stdout.write(f'  {kind}: {written} indexed, {stale} stale removed')
+            total += written
+
+        cache.bump_version()
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {total} search document(s)'))
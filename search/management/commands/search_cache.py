@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from search import cache
+
+
+class Command(BaseCommand):
+    help = 'Show search result cache hit/miss counters, or invalidate the cached results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Invalidate every cached search result')
+        parser.add_argument('--reset-stats', action='store_true', help='Zero the hit/miss counters')
+
+    def handle(self, *args, **options):
+        stats = cache.stats()
+        self.stdout.write(f'  version={cache.current_version()}')
+        if options['reset_stats']:
+            cache.reset_stats()
+            self.stdout.write('  counters reset')
+        if options['clear']:
+            cache.bump_version()
+            self.stdout.write('  cached results invalidated')
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Search cache: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+            f"hit rate {stats['hit_rate']:.1%}"
+        ))
@@ -0,0 +1,87 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+def install_fulltext(apps, schema_editor):
+    from search.backends import get_backend
+    for statement in get_backend(schema_editor.connection).install_sql:
+        schema_editor.execute(statement)
+
+
+def uninstall_fulltext(apps, schema_editor):
+    from search.backends import get_backend
+    for statement in get_backend(schema_editor.connection).uninstall_sql:
+        schema_editor.execute(statement)
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    Post = apps.get_model('posts', 'Post')
+    User = apps.get_model('accounts', 'User')
+    UserSkill = apps.get_model('skills', 'UserSkill')
+    departments = dict(UserSkill._meta.get_field('department').choices)
+
+    def public(user):
+        return not (user.is_staff or user.is_superuser)
+
+    rows = []
+
+    def add(document):
+        rows.append(document)
+        if len(rows) >= 1000:
+            SearchDocument.objects.bulk_create(rows)
+            rows.clear()
+
+    for post in Post.objects.select_related('user').iterator(chunk_size=1000):
+        add(SearchDocument(
+            kind='post', object_id=post.pk, title=f"{post.title} {post.skill_name}",
+            body=post.description, is_public=post.is_active and public(post.user), created_at=post.created_at,
+        ))
+    for user in User.objects.select_related('profile').iterator(chunk_size=1000):
+        profile = getattr(user, 'profile', None)
+        names = [profile.display_name, profile.full_name, profile.handle or ''] if profile else []
+        add(SearchDocument(
+            kind='user', object_id=user.pk, title=' '.join(n for n in names if n),
+            body=user.email, is_public=public(user), created_at=user.date_joined,
+        ))
+    for us in UserSkill.objects.select_related('user', 'skill').iterator(chunk_size=1000):
+        add(SearchDocument(
+            kind='skill', object_id=us.pk, title=us.skill.name,
+            body=f"{us.description} {departments.get(us.department, us.department)}",
+            is_public=public(us.user), created_at=us.created_at,
+        ))
+    SearchDocument.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0003_user_email_canonical_unique'),
+        ('posts', '0001_initial'),
+        ('profiles', '0003_remove_profile_date_of_birth_and_more'),
+        ('skills', '0003_helper_skill_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('user', 'User'), ('skill', 'User skill')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('body', models.TextField(blank=True)),
+                ('is_public', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(install_fulltext, uninstall_fulltext),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
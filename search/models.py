@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one post, user or user skill.
+
+    The full-text index itself lives outside the ORM: a generated ``tsvector``
+    column with a GIN index on Postgres, an FTS5 external-content table kept in
+    sync by triggers on SQLite (see ``search.backends``). SQLite drops those
+    triggers if Django ever rebuilds this table, so run
+    ``rebuild_search_index --install`` after any migration that alters it.
+    """
+    class Kind(models.TextChoices):
+        POST = "post", "Post"
+        USER = "user", "User"
+        SKILL = "skill", "User skill"
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=500, blank=True)
+    body = models.TextField(blank=True)
+    # False for inactive posts and staff/superuser authors; such documents never match
+    is_public = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.title[:40]}"
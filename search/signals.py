@@ -0,0 +1,145 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.models import PUBLIC_AUTHOR_FIELDS
+from posts.models import Post
+from profiles.models import Profile
+from skills.models import Skill, UserSkill
+from . import cache, facets, fuzzy
+from .documents import Kind, index_object, is_public_author, remove_object
+from .models import SearchDocument
+
+# User fields that change what the user's documents contain or who may see them
+USER_INDEXED_FIELDS = {"email"} | PUBLIC_AUTHOR_FIELDS
+# Post fields that neither documents nor search results depend on
+POST_COUNTER_FIELDS = {"views"}
+
+
+def counter_only(update_fields):
+    return update_fields is not None and set(update_fields) <= POST_COUNTER_FIELDS
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and not counter_only(update_fields):
+        index_object(Kind.POST, instance)
+
+
+@receiver(post_save, sender=Post)
+def learn_post_skill_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Never builds or bumps here: a new spelling only expires this worker's
+    # copy (rebuilt on its next search); the rest catch up within MAX_AGE
+    if not raw and not counter_only(update_fields) and instance.skill_name.strip() and fuzzy.is_new_spelling(instance.skill_name):
+        transaction.on_commit(fuzzy.vocabulary.expire)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    remove_object(Kind.POST, instance.pk)
+
+
+@receiver(post_save, sender=UserSkill)
+def index_user_skill(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(Kind.SKILL, instance)
+
+
+@receiver(post_delete, sender=UserSkill)
+def unindex_user_skill(sender, instance, **kwargs):
+    remove_object(Kind.SKILL, instance.pk)
+
+
+@receiver(post_save, sender=Skill)
+def reindex_renamed_skill(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    for user_skill in instance.user_skills.select_related("skill", "user").iterator():
+        index_object(Kind.SKILL, user_skill)
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def refresh_fuzzy_vocabulary(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(fuzzy.vocabulary.bump)
+
+
+@receiver(post_save, sender=Profile)
+def index_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(Kind.USER, instance.user)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Skill)
+def invalidate_search_results(sender, raw=False, update_fields=None, **kwargs):
+    if not raw and not (sender is Post and counter_only(update_fields)):
+        transaction.on_commit(cache.bump_version)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or counter_only(update_fields):
+        return
+    if created:
+        transaction.on_commit(partial(facets.adjust_totals, "posts", facets.post_changes(instance)))
+    else:
+        # The previous kind, visibility and departments aren't known here
+        transaction.on_commit(partial(facets.drop_totals, ("posts",)))
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    transaction.on_commit(partial(facets.adjust_totals, "posts", facets.post_changes(instance, -1)))
+
+
+@receiver(post_save, sender=UserSkill)
+def count_user_skill(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        transaction.on_commit(partial(facets.adjust_totals, "skills", facets.skill_changes(instance)))
+        # Its department can be new to the author's user result and posts
+        transaction.on_commit(partial(facets.drop_totals, ("users", "posts")))
+    else:
+        transaction.on_commit(partial(facets.drop_totals, facets.TOTALS_FACETS))
+
+
+@receiver(post_delete, sender=UserSkill)
+def uncount_user_skill(sender, instance, **kwargs):
+    transaction.on_commit(partial(facets.adjust_totals, "skills", facets.skill_changes(instance, -1)))
+    transaction.on_commit(partial(facets.drop_totals, ("users", "posts")))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login only; skip the saves that can't change a document
+    if raw or (update_fields is not None and not USER_INDEXED_FIELDS & set(update_fields)):
+        return
+    was_public = SearchDocument.objects.filter(
+        kind=Kind.USER, object_id=instance.pk
+    ).values_list("is_public", flat=True).first()
+    index_object(Kind.USER, instance)
+    transaction.on_commit(cache.bump_version)
+    if not created and was_public is not None and was_public != is_public_author(instance):
+        # Staff status hides or reveals everything the user wrote
+        transaction.on_commit(partial(facets.drop_totals, facets.TOTALS_FACETS))
+        for post in instance.posts.all():
+            index_object(Kind.POST, post)
+        for user_skill in instance.user_skills.select_related("skill"):
+            index_object(Kind.SKILL, user_skill)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def unindex_user(sender, instance, **kwargs):
+    remove_object(Kind.USER, instance.pk)
+    # Sent after the user's posts and skills are gone, so this runs last
+    transaction.on_commit(partial(facets.drop_totals, facets.TOTALS_FACETS))
@@ -0,0 +1,178 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Post
+from skills.models import Skill, UserSkill
+
+from . import facets, fuzzy
+from .cache import search_cache
+from .engine import filter_matches, ranked
+from .models import SearchDocument
+
+User = get_user_model()
+POST = SearchDocument.Kind.POST
+
+
+class SearchTestMixin:
+    def setUp(self):
+        self.author = User.objects.create_user("author@example.com", "pw")
+
+    def post(self, title, description="", kind="offer", user=None, skill_name="Tutoring"):
+        return Post.objects.create(
+            user=user or self.author, kind=kind, title=title, description=description, skill_name=skill_name,
+        )
+
+    def matches(self, query, queryset=None):
+        return set(filter_matches(queryset or Post.objects.all(), POST, query).values_list("pk", flat=True))
+
+
+class MatchTests(SearchTestMixin, TestCase):
+    def test_every_term_must_match_as_a_prefix(self):
+        python = self.post("Python for beginners")
+        django = self.post("Django and Python web apps")
+        self.post("Organic chemistry")
+
+        self.assertEqual(self.matches("pyth"), {python.pk, django.pk})
+        self.assertEqual(self.matches("python web"), {django.pk})
+        self.assertEqual(self.matches("   "), set())
+
+    def test_title_matches_rank_above_body_matches(self):
+        body = self.post("Weekly study group", description="We mostly cover calculus problems")
+        title = self.post("Calculus tutoring")
+
+        self.assertEqual([p.pk for p in ranked(Post.objects.all(), POST, "calculus")], [title.pk, body.pk])
+
+    def test_ranking_applies_the_callers_filter_before_the_limit(self):
+        for i in range(5):
+            self.post(f"Python python python {i}")
+        wanted = self.post("Looking for help", description="python", kind="want")
+
+        results = ranked(Post.objects.filter(kind="want"), POST, "python", limit=2)
+
+        self.assertEqual([p.pk for p in results], [wanted.pk])
+
+
+class IndexingTests(SearchTestMixin, TestCase):
+    def test_editing_a_post_reindexes_it(self):
+        post = self.post("Guitar lessons")
+
+        post.title = "Piano lessons"
+        post.save()
+
+        self.assertEqual(self.matches("piano"), {post.pk})
+        self.assertEqual(self.matches("guitar"), set())
+
+    def test_deleting_a_post_removes_its_document(self):
+        post = self.post("Guitar lessons")
+        post.delete()
+
+        self.assertFalse(SearchDocument.objects.filter(kind=POST, object_id=post.pk).exists())
+        self.assertEqual(self.matches("guitar"), set())
+
+    def test_inactive_posts_do_not_match(self):
+        post = self.post("Guitar lessons")
+        post.is_active = False
+        post.save()
+
+        self.assertEqual(self.matches("guitar"), set())
+
+    def test_staff_authors_are_hidden(self):
+        staff = User.objects.create_user("staff@example.com", "pw", is_staff=True)
+        self.post("Guitar lessons", user=staff)
+        visible = self.post("Guitar repairs")
+
+        self.assertEqual(self.matches("guitar"), {visible.pk})
+
+    def test_promoting_an_author_to_staff_hides_their_posts(self):
+        post = self.post("Guitar lessons")
+
+        self.author.is_staff = True
+        self.author.save()
+        self.assertEqual(self.matches("guitar"), set())
+
+        self.author.is_staff = False
+        self.author.save()
+        self.assertEqual(self.matches("guitar"), {post.pk})
+
+
+class FuzzyVocabularyTests(SearchTestMixin, TestCase):
+    def test_saving_a_post_never_builds_the_vocabulary(self):
+        fuzzy.vocabulary.expire()
+
+        with mock.patch.object(fuzzy.vocabulary, "build") as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post("Lessons", skill_name="Ukulele")
+
+        build.assert_not_called()
+
+    def test_new_spelling_expires_only_the_local_copy(self):
+        fuzzy.vocabulary.get()
+        version = cache.get(fuzzy.VERSION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post("Lessons", skill_name="Theremin")
+
+        self.assertIsNone(fuzzy.vocabulary.peek())
+        self.assertEqual(cache.get(fuzzy.VERSION_KEY), version)
+        self.assertTrue(fuzzy.is_known("theremin"))
+
+
+class FacetTotalsTests(SearchTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        search_cache().clear()
+        UserSkill.objects.create(user=self.author, skill=Skill.objects.create(name="Law"), department="law")
+        self.post("Contract law help")
+
+    def totals(self, search_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return facets.facet_totals(search_type)
+
+    def test_profile_edits_keep_the_cached_totals(self):
+        self.totals("posts")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.profile.bio = "Updated"
+            self.author.profile.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totals("posts")["department"]["law"], 1)
+
+    def test_creating_and_deleting_posts_adjusts_the_cached_totals(self):
+        self.assertEqual(self.totals("posts")["kind"], {"offer": 1, "want": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.post("Need a tenancy lawyer", kind="want")
+        with self.assertNumQueries(0):
+            totals = self.totals("posts")
+        self.assertEqual(totals["kind"], {"offer": 1, "want": 1})
+        self.assertEqual(totals["department"]["law"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totals("posts")["department"]["law"], 1)
+
+    def test_adding_a_skill_adjusts_skill_totals_and_recounts_posts(self):
+        self.totals("skills")
+        self.totals("posts")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserSkill.objects.create(user=self.author, skill=Skill.objects.create(name="Drawing"), department="fine_arts")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.totals("skills")["department"]["fine_arts"], 1)
+        self.assertEqual(self.totals("posts")["department"]["fine_arts"], 1)
+
+    def test_promoting_an_author_to_staff_recounts(self):
+        self.totals("posts")
+        self.totals("skills")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.is_staff = True
+            self.author.save()
+
+        self.assertEqual(self.totals("posts")["department"]["law"], 0)
+        self.assertEqual(self.totals("skills")["department"]["law"], 0)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import SkillCategory, Skill, UserSkill
+from .models import HelperSkillIndex, SkillCategory, Skill, UserSkill
 
 
 @admin.register(SkillCategory)
@@ -68,3 +68,17 @@ class UserSkillAdmin(admin.ModelAdmin):
     def experience(self, obj):
         return f"{obj.years_of_experience} years"
     experience.short_description = 'Experience'
+
+
+@admin.register(HelperSkillIndex)
+class HelperSkillIndexAdmin(admin.ModelAdmin):
+    """Skill -> helper lookup used for suggestions (maintained by signals, rebuilt by rebuild_skill_index)"""
+    list_display = ['term', 'helper', 'weight']
+    search_fields = ['term', 'helper__email']
+    readonly_fields = ['user_skill', 'term', 'helper', 'weight']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,69 @@
+"""
+Prefix autocomplete over skill and category names.
+
+Each process keeps a sorted tuple of lowercased keys (the full name and every
+later word in it, so "lea" finds "Machine Learning") and answers a prefix with
+one bisect plus a short forward scan. No database access happens after the
+first build.
+
+The index is rebuilt lazily when its shared version changes (see
+``core.local_index``); saving or deleting a Skill or SkillCategory bumps it
+from ``skills.signals``. The version only reaches other workers when the
+default cache is shared (REDIS_URL), so each copy is also rebuilt after
+MAX_AGE seconds.
+"""
+from bisect import bisect_left
+
+from core.local_index import VersionedIndex
+
+from .models import Skill, SkillCategory
+
+VERSION_KEY = "skills:autocomplete:version"
+MAX_AGE = 300
+MAX_SUGGESTIONS = 20
+
+
+def normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+def build_index():
+    """``(keys, entries)``: sorted lookup keys and the suggestion each one points at"""
+    rows = []
+    for pk, name, category in Skill.objects.values_list("pk", "name", "category__name"):
+        rows.append({"kind": "skill", "id": pk, "name": name, "category": category})
+    for pk, name in SkillCategory.objects.values_list("pk", "name"):
+        rows.append({"kind": "category", "id": pk, "name": name, "category": None})
+
+    pairs = []
+    for entry in rows:
+        words = normalize(entry["name"]).split(" ")
+        for i in range(len(words)):
+            # Full-name keys (i == 0) sort ahead of word keys with the same text
+            pairs.append((" ".join(words[i:]), i > 0, entry["name"].lower(), entry))
+    pairs.sort(key=lambda p: p[:3])
+    return tuple(p[0] for p in pairs), tuple(p[3] for p in pairs)
+
+
+# Built as one tuple so readers never pair new keys with old entries
+index = VersionedIndex(VERSION_KEY, build_index, max_age=MAX_AGE)
+
+
+def suggest(prefix, limit=10):
+    """Up to ``limit`` skills/categories whose name, or a word in it, starts with ``prefix``"""
+    prefix = normalize(prefix)
+    if not prefix:
+        return []
+    limit = min(max(limit, 1), MAX_SUGGESTIONS)
+    keys, entries = index.get()
+
+    results, seen = [], set()
+    i = bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix) and len(results) < limit:
+        entry = entries[i]
+        marker = (entry["kind"], entry["id"])
+        if marker not in seen:
+            seen.add(marker)
+            results.append(entry)
+        i += 1
+    return results
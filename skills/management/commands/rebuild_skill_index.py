@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from skills.models import HelperSkillIndex, UserSkill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the helper skill index from UserSkill in id-ordered chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='User skills per chunk')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        last_id, rebuilt = 0, 0
+        while True:
+            chunk = list(
+                UserSkill.objects.filter(id__gt=last_id).select_related('skill').order_by('id')[:chunk_size]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                HelperSkillIndex.objects.bulk_create(
+                    [HelperSkillIndex.entry_for(us) for us in chunk],
+                    update_conflicts=True,
+                    unique_fields=['user_skill'],
+                    update_fields=['term', 'helper', 'weight'],
+                )
+            rebuilt += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'  user skills up to #{last_id}: {rebuilt} indexed')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt helper skill index for {rebuilt} user skill(s)'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    UserSkill = apps.get_model('skills', 'UserSkill')
+    HelperSkillIndex = apps.get_model('skills', 'HelperSkillIndex')
+    weights = {'beginner': 1, 'intermediate': 2, 'advanced': 3, 'expert': 4}
+    rows = UserSkill.objects.values_list('pk', 'user_id', 'skill__name', 'proficiency_level').order_by('pk')
+    batch = []
+    for pk, user_id, name, level in rows.iterator(chunk_size=2000):
+        batch.append(HelperSkillIndex(
+            user_skill_id=pk, helper_id=user_id, term=name.lower(), weight=weights.get(level, 1)
+        ))
+        if len(batch) >= 2000:
+            HelperSkillIndex.objects.bulk_create(batch)
+            batch = []
+    HelperSkillIndex.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0002_userskill_department'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelperSkillIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('helper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_skill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='index_entry', to='skills.userskill')),
+            ],
+            options={
+                'verbose_name': 'Helper skill index entry',
+                'verbose_name_plural': 'Helper skill index',
+                'indexes': [models.Index(fields=['term', 'helper', 'weight'], name='skills_help_term_c3e0cb_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def hide_staff_skills(apps, schema_editor):
+    UserSkill = apps.get_model('skills', 'UserSkill')
+    # Only staff rows differ from the default, and there are few of them
+    UserSkill.objects.filter(Q(user__is_staff=True) | Q(user__is_superuser=True)).update(author_is_public=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0003_helper_skill_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userskill',
+            name='author_is_public',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(hide_staff_skills, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='userskill',
+            index=models.Index(fields=['author_is_public', 'department', '-created_at'], name='userskill_public_dept_idx'),
+        ),
+    ]
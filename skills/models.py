@@ -67,6 +67,8 @@ class UserSkill(models.Model):
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name="user_skills")
     department = models.CharField(max_length=50, choices=DEPARTMENTS, default='other', help_text="Your academic department")
     proficiency_level = models.CharField(max_length=20, choices=PROFICIENCY_LEVELS, default='beginner')
+    # Copy of user.is_public_author so search can filter without joining users
+    author_is_public = models.BooleanField(default=True, editable=False)
     years_of_experience = models.DecimalField(max_digits=4, decimal_places=1, default=0.0)
     description = models.TextField(blank=True, default='', help_text="Describe your experience with this skill")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -74,8 +76,76 @@ class UserSkill(models.Model):
     class Meta:
         unique_together = [('user', 'skill')]
         ordering = ['-years_of_experience', 'skill__name']
+        indexes = [
+            models.Index(fields=['author_is_public', 'department', '-created_at'], name='userskill_public_dept_idx'),
+        ]
         verbose_name = "User Skill"
         verbose_name_plural = "User Skills"
     
     def __str__(self):
         return f"{self.user.email} - {self.skill.name} ({self.proficiency_level})"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.author_is_public = self.user.is_public_author
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def department_bit(cls, department):
+        """Bit for ``department`` in a department set stored as an integer (see Post.author_departments).
+
+        Bits follow the order of DEPARTMENTS, so new departments go at the end;
+        reordering them needs ``rebuild_author_flags``.
+        """
+        codes = [code for code, _ in cls.DEPARTMENTS]
+        return 1 << codes.index(department) if department in codes else 0
+
+    @classmethod
+    def department_mask(cls, departments):
+        mask = 0
+        for department in departments:
+            mask |= cls.department_bit(department)
+        return mask
+
+    @classmethod
+    def refresh_author_visibility(cls, user):
+        flag = user.is_public_author
+        return cls.objects.filter(user=user).exclude(author_is_public=flag).update(author_is_public=flag)
+
+
+class HelperSkillIndex(models.Model):
+    """Inverted index from a lowercased skill name to the users who can teach it.
+
+    One row per UserSkill, kept in step by signals, so ranking helpers for a
+    set of wanted skills is a single lookup on (term, weight).
+    """
+    PROFICIENCY_WEIGHTS = {
+        'beginner': 1,
+        'intermediate': 2,
+        'advanced': 3,
+        'expert': 4,
+    }
+
+    user_skill = models.OneToOneField(UserSkill, on_delete=models.CASCADE, related_name='index_entry')
+    term = models.CharField(max_length=100)
+    helper = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'helper', 'weight']),
+        ]
+        verbose_name = "Helper skill index entry"
+        verbose_name_plural = "Helper skill index"
+
+    def __str__(self):
+        return f"{self.term} -> {self.helper_id} ({self.weight})"
+
+    @classmethod
+    def entry_for(cls, user_skill):
+        return cls(
+            user_skill=user_skill,
+            term=user_skill.skill.name.lower(),
+            helper_id=user_skill.user_id,
+            weight=cls.PROFICIENCY_WEIGHTS.get(user_skill.proficiency_level, 1),
+        )
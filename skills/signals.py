@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from accounts.models import PUBLIC_AUTHOR_FIELDS
+from . import autocomplete
+from .models import HelperSkillIndex, Skill, SkillCategory, UserSkill
+
+
+@receiver(post_save, sender=UserSkill)
+def index_user_skill(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entry = HelperSkillIndex.entry_for(instance)
+    HelperSkillIndex.objects.update_or_create(
+        user_skill=instance,
+        defaults={'term': entry.term, 'helper_id': entry.helper_id, 'weight': entry.weight},
+    )
+
+
+@receiver(post_save, sender=Skill)
+def reindex_renamed_skill(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    HelperSkillIndex.objects.filter(user_skill__skill=instance).exclude(
+        term=instance.name.lower()
+    ).update(term=instance.name.lower())
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=SkillCategory)
+@receiver(post_delete, sender=SkillCategory)
+def invalidate_autocomplete(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(autocomplete.index.bump)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_author_visibility(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and not PUBLIC_AUTHOR_FIELDS & set(update_fields)):
+        return
+    UserSkill.refresh_author_visibility(instance)
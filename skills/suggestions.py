@@ -0,0 +1,73 @@
+"""
+Helper suggestions ranked by how well a helper's skills cover what the
+requester wants to learn.
+
+    score = sum of proficiency weights over matching skills
+            + a small bonus for sessions already helped (capped)
+
+Wanted skills come from the requester's active "looking for help" posts plus
+any skill passed in explicitly. Ranking is one grouped query over
+HelperSkillIndex; users are then loaded in a second query.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Least
+
+from .models import HelperSkillIndex
+
+# Each skill match weighs as much as this many helped sessions
+MATCH_WEIGHT = 10
+SESSION_BONUS_CAP = 20
+
+
+def wanted_terms(user, extra=()):
+    """Lowercased skill names ``user`` is looking for help with"""
+    from posts.models import Post
+
+    terms = {t.strip().lower() for t in extra if t and t.strip()}
+    terms.update(
+        name.strip().lower()
+        for name in Post.objects.filter(user=user, kind='want', is_active=True)
+        .values_list('skill_name', flat=True)[:50]
+        if name.strip()
+    )
+    return terms
+
+
+def rank_helpers(user, terms, limit=10):
+    """``[(helper_id, score), ...]`` best first, for helpers matching any of ``terms``"""
+    if not terms:
+        return []
+    ranked = (
+        HelperSkillIndex.objects.filter(term__in=terms, helper__email_verified=True, helper__is_active=True)
+        .exclude(helper=user)
+        .values('helper')
+        .annotate(score=Sum('weight') * MATCH_WEIGHT + Least(
+            Coalesce(Max('helper__credit_stats__sessions_helped'), Value(0)), Value(SESSION_BONUS_CAP)
+        ))
+        .order_by('-score', 'helper')
+        .values_list('helper', 'score')[:limit]
+    )
+    return list(ranked)
+
+
+def suggest_helpers(user, skills=(), limit=10):
+    """Up to ``limit`` users to suggest as helpers for ``user``, best match first.
+
+    Falls back to the most experienced verified helpers when the requester has
+    no wanted skills or too few helpers match them.
+    """
+    User = get_user_model()
+    ranked = rank_helpers(user, wanted_terms(user, skills), limit)
+    ids = [helper_id for helper_id, _ in ranked]
+
+    if len(ids) < limit:
+        ids += list(
+            User.objects.filter(email_verified=True, is_active=True)
+            .exclude(pk__in=ids + [user.pk])
+            .order_by(F('credit_stats__sessions_helped').desc(nulls_last=True), 'pk')
+            .values_list('pk', flat=True)[:limit - len(ids)]
+        )
+
+    users = User.objects.filter(pk__in=ids).select_related('profile').in_bulk()
+    return [users[pk] for pk in ids if pk in users]
@@ -1,3 +1,43 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.local_index import VersionedIndex
+
+from . import autocomplete
+from .models import Skill, SkillCategory
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        category = SkillCategory.objects.create(name="Computing")
+        Skill.objects.create(name="Machine Learning", category=category)
+        autocomplete.index.bump()
+
+    def names(self, prefix):
+        return [entry["name"] for entry in autocomplete.suggest(prefix)]
+
+    def test_matches_any_word_prefix(self):
+        self.assertEqual(self.names("lea"), ["Machine Learning"])
+        self.assertEqual(self.names("comp"), ["Computing"])
+
+    def test_saving_a_skill_rebuilds_the_index(self):
+        self.assertEqual(self.names("pyth"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name="Python", category=SkillCategory.objects.get())
+
+        self.assertEqual(self.names("pyth"), ["Python"])
+
+
+class VersionedIndexTests(TestCase):
+    def test_rebuilds_after_max_age_without_a_bump(self):
+        # What a worker that never sees the bump (per-process cache) relies on
+        builds = []
+        index = VersionedIndex("tests:index:version", lambda: builds.append(1) or len(builds), max_age=300)
+
+        with mock.patch("core.local_index.time.monotonic", return_value=1000.0):
+            self.assertEqual(index.get(), 1)
+        with mock.patch("core.local_index.time.monotonic", return_value=1200.0):
+            self.assertEqual(index.get(), 1)
+        with mock.patch("core.local_index.time.monotonic", return_value=1301.0):
+            self.assertEqual(index.get(), 2)
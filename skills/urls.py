@@ -7,6 +7,7 @@ urlpatterns = [
     path('', views.my_skills, name='my_skills'),
     path('add/', views.add_skill, name='add'),
     path('browse/', views.browse_skills, name='browse'),
+    path('autocomplete/', views.autocomplete_skills, name='autocomplete'),
     path('<int:pk>/edit/', views.edit_skill, name='edit'),
     path('<int:pk>/delete/', views.delete_skill, name='delete'),
 ]
@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
+from .autocomplete import suggest
 from .models import Skill, UserSkill, SkillCategory
 from .forms import UserSkillForm
 
@@ -87,3 +89,14 @@ def browse_skills(request):
         'query': query,
         'selected_category': category_id,
     })
+
+
+@login_required
+def autocomplete_skills(request):
+    """JSON prefix suggestions for skill and category names, served from memory"""
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    query = request.GET.get('q', '')
+    return JsonResponse({'query': query, 'results': suggest(query, limit)})